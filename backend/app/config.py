@@ -12,16 +12,104 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./freight_rates.db")
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "True") == "True"
     
     # OpenAI
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     
+    # AI summaries, generated off the request path: "" (template only), "stub" or "openai".
+    # Quotes wait up to SUMMARY_INLINE_DEADLINE seconds for the model summary (0: never wait);
+    # beyond SUMMARY_MAX_PENDING queued generations, quotes keep the template summary
+    summary_model: str = os.getenv("SUMMARY_MODEL", "")
+    summary_openai_model: str = os.getenv("SUMMARY_OPENAI_MODEL", "gpt-4")
+    summary_timeout: float = float(os.getenv("SUMMARY_TIMEOUT", "30"))
+    summary_inline_deadline: float = float(os.getenv("SUMMARY_INLINE_DEADLINE", "0"))
+    summary_concurrency: int = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+    summary_max_pending: int = int(os.getenv("SUMMARY_MAX_PENDING", "64"))
+    summary_cache_max_entries: int = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "4096"))
+    
     # Freight APIs
     freightos_api_key: str = os.getenv("FREIGHTOS_API_KEY", "")
     shipengine_api_key: str = os.getenv("SHIPENGINE_API_KEY", "")
     easypost_api_key: str = os.getenv("EASYPOST_API_KEY", "")
     xeneta_api_key: str = os.getenv("XENETA_API_KEY", "")
     
+    # Provider fan-out (seconds)
+    provider_timeout: float = float(os.getenv("PROVIDER_TIMEOUT", "8"))
+    quote_deadline: float = float(os.getenv("QUOTE_DEADLINE", "12"))
+    
+    # Provider HTTP pools
+    freightos_base_url: str = os.getenv("FREIGHTOS_BASE_URL", "https://api.freightos.com")
+    shipengine_base_url: str = os.getenv("SHIPENGINE_BASE_URL", "https://api.shipengine.com")
+    easypost_base_url: str = os.getenv("EASYPOST_BASE_URL", "https://api.easypost.com")
+    http_max_connections: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    http_max_keepalive: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+    http_keepalive_expiry: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    provider_max_concurrency: int = int(os.getenv("PROVIDER_MAX_CONCURRENCY", "10"))
+    
+    # Provider health: circuit breakers, adaptive timeouts, hedging (seconds)
+    breaker_failure_threshold: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    breaker_cooldown: float = float(os.getenv("BREAKER_COOLDOWN", "30"))
+    health_ewma_alpha: float = float(os.getenv("HEALTH_EWMA_ALPHA", "0.2"))
+    health_min_samples: int = int(os.getenv("HEALTH_MIN_SAMPLES", "10"))
+    adaptive_timeout_k: float = float(os.getenv("ADAPTIVE_TIMEOUT_K", "4"))
+    adaptive_timeout_min: float = float(os.getenv("ADAPTIVE_TIMEOUT_MIN", "1"))
+    hedge_requests: bool = os.getenv("HEDGE_REQUESTS", "True") == "True"
+    hedge_delay_k: float = float(os.getenv("HEDGE_DELAY_K", "1.65"))
+    
+    # Provider API key quotas (requests per second, burst size; 0 disables)
+    rate_limit_backend: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    freightos_rate_limit: float = float(os.getenv("FREIGHTOS_RATE_LIMIT", "5"))
+    freightos_rate_burst: int = int(os.getenv("FREIGHTOS_RATE_BURST", "10"))
+    shipengine_rate_limit: float = float(os.getenv("SHIPENGINE_RATE_LIMIT", "5"))
+    shipengine_rate_burst: int = int(os.getenv("SHIPENGINE_RATE_BURST", "10"))
+    easypost_rate_limit: float = float(os.getenv("EASYPOST_RATE_LIMIT", "5"))
+    easypost_rate_burst: int = int(os.getenv("EASYPOST_RATE_BURST", "10"))
+    
+    # Quote cache (TTLs in seconds)
+    quote_cache_backend: str = os.getenv("QUOTE_CACHE_BACKEND", "memory")
+    redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    quote_cache_max_entries: int = int(os.getenv("QUOTE_CACHE_MAX_ENTRIES", "4096"))
+    quote_cache_ttl_ocean: float = float(os.getenv("QUOTE_CACHE_TTL_OCEAN", "3600"))
+    quote_cache_ttl_air: float = float(os.getenv("QUOTE_CACHE_TTL_AIR", "300"))
+    quote_cache_ttl_land: float = float(os.getenv("QUOTE_CACHE_TTL_LAND", "900"))
+    
+    # Option sessions for re-ranking by requestId (TTL in seconds, 0 disables)
+    option_session_ttl: float = float(os.getenv("OPTION_SESSION_TTL", "1800"))
+    option_session_max_entries: int = int(os.getenv("OPTION_SESSION_MAX_ENTRIES", "2048"))
+    
+    # Directory for the memory-mapped sea-lane distance matrix (empty: system temp dir)
+    distance_matrix_dir: str = os.getenv("DISTANCE_MATRIX_DIR", "")
+    
+    # Contracted rate card directory (empty: reference card, used only when providers fail);
+    # with a contracted card, lanes it fully covers are priced locally without calling providers
+    rate_card_dir: str = os.getenv("RATE_CARD_DIR", "")
+    rate_card_fast_path: bool = os.getenv("RATE_CARD_FAST_PATH", "True") == "True"
+    
+    # Batch quoting
+    batch_max_items: int = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+    batch_concurrency: int = int(os.getenv("BATCH_CONCURRENCY", "32"))
+    
+    # Write-behind quote persistence
+    persist_quotes: bool = os.getenv("PERSIST_QUOTES", "True") == "True"
+    quote_queue_size: int = int(os.getenv("QUOTE_QUEUE_SIZE", "10000"))
+    quote_flush_batch: int = int(os.getenv("QUOTE_FLUSH_BATCH", "500"))
+    quote_flush_interval: float = float(os.getenv("QUOTE_FLUSH_INTERVAL", "1"))
+    quote_enqueue_timeout: float = float(os.getenv("QUOTE_ENQUEUE_TIMEOUT", "0.05"))
+    
+    # Lane rate benchmarks
+    benchmark_window_days: int = int(os.getenv("BENCHMARK_WINDOW_DAYS", "30"))
+    benchmark_trend_days: int = int(os.getenv("BENCHMARK_TREND_DAYS", "7"))
+    benchmark_min_samples: int = int(os.getenv("BENCHMARK_MIN_SAMPLES", "20"))
+    benchmark_cache_ttl: float = float(os.getenv("BENCHMARK_CACHE_TTL", "60"))
+    
+    # Observability: log a per-stage breakdown for requests slower than this (seconds)
+    slow_request_seconds: float = float(os.getenv("SLOW_REQUEST_SECONDS", "2"))
+    
     # Frontend
     frontend_url: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
     
@@ -1,29 +1,95 @@
-import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.config import settings
 from app.models.database import Base
 
+logger = logging.getLogger(__name__)
+
+# Async drivers for the sync-style URLs used in .env / docker-compose
+ASYNC_DRIVERS = {
+    "sqlite://": "sqlite+aiosqlite://",
+    "postgresql://": "postgresql+asyncpg://",
+    "postgres://": "postgresql+asyncpg://",
+}
+
+def async_database_url(url: str) -> str:
+    """Rewrite a plain database URL to use its async driver"""
+    for prefix, async_prefix in ASYNC_DRIVERS.items():
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
 # Database configuration
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./freight_rates.db")
+DATABASE_URL = async_database_url(settings.database_url)
 
-# For SQLite
+# For SQLite (single file, no server-side pool to tune)
 if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL, connect_args={"check_same_thread": False}
-    )
+    engine = create_async_engine(DATABASE_URL)
 else:
-    engine = create_engine(DATABASE_URL)
+    engine = create_async_engine(
+        DATABASE_URL,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+
+def upgrade_schema(conn):
+    """
+    Bring tables created by earlier versions up to the current models
+
+    ``create_all`` skips tables that already exist, so this adds their
+    missing columns and indexes, and replaces the old unique index on
+    quotes.request_id: each quote now stores one row per option, unique on
+    (request_id, option_index).
+    """
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            if column.default is not None and column.default.is_scalar:
+                conn.execute(table.update().values({column.name: column.default.arg}))
+            logger.info(f"Added column {table.name}.{column.name}")
+
+    for index in inspector.get_indexes("quotes"):
+        if index["unique"] and index["column_names"] == ["request_id"] and not index.get("duplicates_constraint"):
+            conn.execute(text(f"DROP INDEX {index['name']}"))
+            logger.info(f"Dropped unique index {index['name']} on quotes.request_id")
+    for constraint in inspector.get_unique_constraints("quotes"):
+        if constraint["column_names"] != ["request_id"]:
+            continue
+        if conn.dialect.name == "sqlite" or not constraint["name"]:
+            raise RuntimeError(
+                "quotes.request_id has a UNIQUE constraint from an older schema that cannot be "
+                "dropped in place; rebuild the quotes table before starting this version"
+            )
+        conn.execute(text(f"ALTER TABLE quotes DROP CONSTRAINT {constraint['name']}"))
+        logger.info(f"Dropped unique constraint {constraint['name']} on quotes.request_id")
+
+    inspector = inspect(conn)
+    unique_keys = [c["column_names"] for c in inspector.get_unique_constraints("quotes")]
+    unique_keys += [i["column_names"] for i in inspector.get_indexes("quotes") if i["unique"]]
+    if ["request_id", "option_index"] not in unique_keys:
+        conn.execute(text("CREATE UNIQUE INDEX uq_quotes_request_option ON quotes (request_id, option_index)"))
+        logger.info("Added unique index on quotes (request_id, option_index)")
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
 
 async def init_db():
-    """Initialize database tables"""
-    Base.metadata.create_all(bind=engine)
-
-def get_db():
-    """Get database session"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    """Initialize database tables, upgrading existing ones in place"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+
+async def close_db():
+    """Dispose of pooled connections"""
+    await engine.dispose()
@@ -1,6 +1,6 @@
 # Database models for ORM
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, JSON, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -9,11 +9,15 @@ class Quote(Base):
     __tablename__ = "quotes"
     
     id = Column(Integer, primary_key=True, index=True)
-    request_id = Column(String, unique=True, index=True)
-    origin = Column(String, index=True)
-    destination = Column(String, index=True)
+    request_id = Column(String, index=True)
+    option_index = Column(Integer, default=0)
+    origin = Column(String)
+    destination = Column(String)
+    origin_code = Column(String)
+    destination_code = Column(String)
     shipment_types = Column(JSON)
     weight = Column(Float)
+    weight_band = Column(Integer, nullable=True)
     volume = Column(Float)
     commodity = Column(String)
     price = Column(Float)
@@ -21,8 +25,63 @@ class Quote(Base):
     mode = Column(String)
     route = Column(JSON)
     carbon_footprint = Column(Float, nullable=True)
+    reliability = Column(Float, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Lane-first composites back the history queries; id is the keyset tiebreaker
+    __table_args__ = (
+        UniqueConstraint("request_id", "option_index"),
+        Index("ix_quotes_lane_created", "origin_code", "destination_code", "created_at", "id"),
+        Index("ix_quotes_lane_mode_created", "origin_code", "destination_code", "mode", "created_at", "id"),
+        Index("ix_quotes_lane_price", "origin_code", "destination_code", "price", "id"),
+        Index("ix_quotes_destination_created", "destination_code", "created_at", "id"),
+        Index("ix_quotes_created", "created_at", "id"),
+    )
+
+class LaneRateDaily(Base):
+    """Daily price histogram per lane, mode and weight band"""
+    __tablename__ = "lane_rate_daily"
+    
+    id = Column(Integer, primary_key=True)
+    origin_code = Column(String, nullable=False)
+    destination_code = Column(String, nullable=False)
+    mode = Column(String, nullable=False)
+    weight_band = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False)
+    count = Column(Integer, default=0)
+    price_sum = Column(Float, default=0.0)
+    price_min = Column(Float, nullable=True)
+    price_max = Column(Float, nullable=True)
+    histogram = Column(JSON)
+    
+    __table_args__ = (
+        UniqueConstraint("origin_code", "destination_code", "mode", "weight_band", "day",
+                         name="uq_lane_rate_daily_bucket"),
+    )
+
+class LaneRateBenchmark(Base):
+    """Rolling-window market stats per lane, mode and weight band"""
+    __tablename__ = "lane_rate_benchmarks"
+    
+    id = Column(Integer, primary_key=True)
+    origin_code = Column(String, nullable=False)
+    destination_code = Column(String, nullable=False)
+    weight_band = Column(Integer, nullable=False)
+    mode = Column(String, nullable=False)
+    sample_count = Column(Integer, default=0)
+    median = Column(Float, nullable=True)
+    p10 = Column(Float, nullable=True)
+    p90 = Column(Float, nullable=True)
+    trend = Column(Float, nullable=True)
+    cdf = Column(JSON)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Lane lookups read every mode of a (lane, band) with one index range
+    __table_args__ = (
+        UniqueConstraint("origin_code", "destination_code", "weight_band", "mode",
+                         name="uq_lane_rate_benchmark"),
+    )
 
 class Booking(Base):
     __tablename__ = "bookings"
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Any, Literal
+from datetime import datetime
 from enum import Enum
 
 class ShipmentTypeEnum(str, Enum):
@@ -44,6 +45,7 @@ class TransportLegResponse(BaseModel):
     duration: str
     carrier: Optional[str] = None
     distance_km: Optional[float] = None
+    co2e_kg: Optional[float] = None
 
 class ShippingOptionResponse(BaseModel):
     mode: str
@@ -52,14 +54,62 @@ class ShippingOptionResponse(BaseModel):
     route: List[TransportLegResponse]
     carbonFootprint: Optional[float] = None
     reliability: Optional[float] = None
+    marketPercentile: Optional[float] = None
+
+class LaneBenchmarkResponse(BaseModel):
+    mode: str
+    sampleCount: int
+    median: Optional[float] = None
+    p10: Optional[float] = None
+    p90: Optional[float] = None
+    trend: Optional[float] = None
 
 class QuoteResponse(BaseModel):
     cheapest: ShippingOptionResponse
     fastest: ShippingOptionResponse
     bestValue: ShippingOptionResponse
     options: List[ShippingOptionResponse]
+    paretoFrontier: List[ShippingOptionResponse] = []
+    marketBenchmarks: List[LaneBenchmarkResponse] = []
     aiSummary: str
     requestId: str
+    aiSummaryStatus: Literal["template", "pending", "ready"] = "template"
+
+class AISummaryResponse(BaseModel):
+    requestId: str
+    status: Literal["template", "pending", "ready"]
+    aiSummary: Optional[str] = None
+
+class BatchQuoteRequest(BaseModel):
+    items: List[ShipmentDetailsRequest] = Field(..., min_length=1)
+
+class BatchQuoteItem(BaseModel):
+    index: int
+    status: int
+    quote: Optional[QuoteResponse] = None
+    error: Optional[Any] = None
+
+class BatchQuoteResponse(BaseModel):
+    results: List[BatchQuoteItem]
+    uniqueLanes: int
+
+class QuoteHistoryItem(BaseModel):
+    id: int
+    requestId: str
+    optionIndex: int
+    origin: str
+    destination: str
+    mode: str
+    price: float
+    transitDays: int
+    route: List[TransportLegResponse]
+    carbonFootprint: Optional[float] = None
+    reliability: Optional[float] = None
+    createdAt: datetime
+
+class QuoteHistoryResponse(BaseModel):
+    items: List[QuoteHistoryItem]
+    nextCursor: Optional[str] = None
 
 class ValidationResponse(BaseModel):
     valid: bool
@@ -68,9 +118,12 @@ class ValidationResponse(BaseModel):
     errors: List[str]
 
 class RecommendationRequest(BaseModel):
-    shipmentDetails: ShipmentDetailsRequest
-    options: List[ShippingOptionResponse]
+    # Either the requestId of a recent quote, or the shipment and its options
+    requestId: Optional[str] = None
+    shipmentDetails: Optional[ShipmentDetailsRequest] = None
+    options: Optional[List[ShippingOptionResponse]] = None
     priorities: Optional[dict] = None
+    topK: Optional[int] = Field(None, ge=1)
 
 class RecommendationResponse(BaseModel):
     recommendations: List[dict]
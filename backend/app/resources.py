@@ -0,0 +1,116 @@
+"""
+Process-wide resources owned by the app lifespan
+Each worker builds one agent, provider client set, quote cache and DB pool
+at startup; routes receive them through the dependencies below.
+"""
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional, AsyncIterator
+
+from fastapi import FastAPI, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import SessionLocal, init_db, close_db
+from app.services.agent import FreightRateAgent
+from app.services.cache import QuoteCache
+from app.services.freight_providers import FreightProviders
+from app.services.http_client import ProviderHTTPClients, provider_http
+from app.services.provider_health import ProviderHealthRegistry, provider_health
+from app.services.rate_limiter import RateLimitScheduler, rate_limiter
+from app.services.persistence import QuoteWriter, quote_writer
+from app.services.sessions import OptionSessionStore, option_sessions
+from app.services.routing import get_route_graph
+from app.services.locations import get_location_resolver
+from app.services.distances import get_distance_service
+from app.services.emissions import get_emissions_engine
+from app.services.rate_cards import get_rate_card
+from app.services.summaries import SummaryService, build_summary_model
+
+logger = logging.getLogger(__name__)
+
+class AppResources:
+    """
+    Container for the shared resources of one worker process.
+
+    Defaults are the module-level singletons (HTTP pools, provider health,
+    rate limiter, quote writer, option sessions) plus a fresh quote cache
+    and an AI summary service for the configured model;
+    the agent and its providers are built once on top of them. ``startup`` and ``shutdown``
+    run from the app lifespan.
+    """
+
+    def __init__(
+        self,
+        http: Optional[ProviderHTTPClients] = None,
+        health: Optional[ProviderHealthRegistry] = None,
+        limiter: Optional[RateLimitScheduler] = None,
+        cache: Optional[QuoteCache] = None,
+        writer: Optional[QuoteWriter] = None,
+        sessions: Optional[OptionSessionStore] = None,
+        summaries: Optional[SummaryService] = None,
+        session_factory=SessionLocal,
+    ):
+        self.http = http or provider_http
+        self.health = health or provider_health
+        self.limiter = limiter or rate_limiter
+        self.cache = cache or QuoteCache()
+        self.writer = writer or quote_writer
+        self.sessions = sessions if sessions is not None else option_sessions
+        self.summaries = summaries or SummaryService(build_summary_model())
+        self.session_factory = session_factory
+        self.providers = FreightProviders(self.http, self.health, self.limiter)
+        self.agent = FreightRateAgent(
+            providers=self.providers, cache=self.cache, sessions=self.sessions, summaries=self.summaries
+        )
+
+    async def startup(self):
+        await init_db()
+        # Load the location index, route graph, distance matrix, emission
+        # factors and rate card before the first request
+        get_location_resolver()
+        get_route_graph()
+        get_distance_service()
+        get_emissions_engine()
+        get_rate_card()
+        self.writer.start()
+
+    async def shutdown(self):
+        # Flush queued quotes while the pool is still open
+        await self.writer.stop()
+        await self.summaries.aclose()
+        await self.agent.aclose()
+        await self.http.aclose()
+        await self.limiter.aclose()
+        await close_db()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Build the worker's resources, expose them on ``app.state`` and release them on exit"""
+    resources = AppResources()
+    await resources.startup()
+    app.state.resources = resources
+    try:
+        yield
+    finally:
+        await resources.shutdown()
+        logger.info("Released app resources")
+
+def get_resources(request: Request) -> AppResources:
+    return request.app.state.resources
+
+def get_agent(request: Request) -> FreightRateAgent:
+    return request.app.state.resources.agent
+
+def get_quote_writer(request: Request) -> QuoteWriter:
+    return request.app.state.resources.writer
+
+def get_option_sessions(request: Request) -> OptionSessionStore:
+    return request.app.state.resources.sessions
+
+def get_summaries(request: Request) -> SummaryService:
+    return request.app.state.resources.summaries
+
+async def get_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """Get database session from the shared pool"""
+    async with request.app.state.resources.session_factory() as db:
+        yield db
@@ -2,6 +2,7 @@
 API Routes for agent operations
 """
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
 from typing import List
 import logging
 
@@ -12,14 +13,19 @@ from app.models.schemas import (
     RecommendationResponse,
 )
 from app.services.agent import FreightRateAgent
+from app.services.options import Option
+from app.services.sessions import OptionSessionStore
+from app.resources import get_agent, get_option_sessions
+from app.services.scoring import DEFAULT_PRIORITIES, OptionColumns, score_components, priority_weights, top_k
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-agent = FreightRateAgent()
-
 @router.post("/agent/validate")
-async def validate_shipment(details: ShipmentDetailsRequest) -> ValidationResponse:
+async def validate_shipment(
+    details: ShipmentDetailsRequest,
+    agent: FreightRateAgent = Depends(get_agent)
+) -> ValidationResponse:
     """
     Validate and normalize shipment details
     Step 1 of the agent workflow
@@ -31,31 +37,44 @@ async def validate_shipment(details: ShipmentDetailsRequest) -> ValidationRespon
         logger.error(f"Validation error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/agent/recommend")
-async def get_recommendations(request: RecommendationRequest) -> RecommendationResponse:
+@router.post("/agent/recommend", response_model=RecommendationResponse)
+async def get_recommendations(
+    request: RecommendationRequest,
+    sessions: OptionSessionStore = Depends(get_option_sessions)
+) -> ORJSONResponse:
     """
     Get AI recommendations for shipping options
     Step 6 of the agent workflow
+    With the requestId of a recent quote, its options are re-ranked
+    server-side and need not be sent again.
     """
+    session = None
+    if request.requestId:
+        session = sessions.get(request.requestId)
+        if session is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Quote {request.requestId} has expired; send the options instead"
+            )
+    
     try:
-        if not request.options:
+        if session is not None:
+            # Score components are cached on the session; only the weights change
+            options = session.options
+            components = session.components
+        elif request.options:
+            options = request.options
+            components = score_components(OptionColumns(options))
+        else:
             raise ValueError("No shipping options provided")
         
         # Generate recommendations based on priorities
-        priorities = request.priorities or {"cost": 0.5, "speed": 0.3, "reliability": 0.2}
-        
-        # Score each option
-        scored_options = []
-        for option in request.options:
-            score = (
-                (1 - option.price / max(o.price for o in request.options)) * priorities.get("cost", 0.5) +
-                (1 - option.transitDays / max(o.transitDays for o in request.options)) * priorities.get("speed", 0.3) +
-                (option.reliability or 0.85) * priorities.get("reliability", 0.2)
-            )
-            scored_options.append((option, score))
+        priorities = request.priorities or dict(DEFAULT_PRIORITIES)
         
-        # Sort by score
-        scored_options.sort(key=lambda x: x[1], reverse=True)
+        # Score all options in one batched pass and rank the best
+        scores = priority_weights(priorities) @ components
+        ranked = top_k(scores, request.topK)
+        scored_options = [(options[i], float(scores[i])) for i in ranked]
         
         # Get top recommendation
         selected = scored_options[0][0]
@@ -79,11 +98,11 @@ async def get_recommendations(request: RecommendationRequest) -> RecommendationR
             for i, (opt, score) in enumerate(scored_options)
         ]
         
-        return RecommendationResponse(
-            recommendations=recommendations,
-            analysis=analysis.strip(),
-            selectedOption=selected
-        )
+        return ORJSONResponse({
+            "recommendations": recommendations,
+            "analysis": analysis.strip(),
+            "selectedOption": selected.to_dict() if isinstance(selected, Option) else selected.model_dump(),
+        })
     
     except Exception as e:
         logger.error(f"Recommendation error: {e}")
@@ -1,55 +1,250 @@
 """
 API Routes for freight quotes
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import Optional, Literal
+import asyncio
+import json
 import logging
 
 from app.models.schemas import (
     ShipmentDetailsRequest,
     QuoteResponse,
+    BatchQuoteRequest,
+    BatchQuoteResponse,
+    QuoteHistoryResponse,
+    AISummaryResponse,
 )
+from app.resources import get_agent, get_quote_writer, get_summaries, get_db
 from app.services.agent import FreightRateAgent
+from app.services.options import QuoteResult
+from app.services.persistence import QuoteWriter
+from app.services.summaries import SummaryService, TEMPLATE, PENDING
+from app.services.history import query_quote_history
+from app.services.rate_limiter import request_priority, BATCH
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-agent = FreightRateAgent()
+async def run_quote_workflow(
+    details: ShipmentDetailsRequest,
+    agent: FreightRateAgent,
+    writer: QuoteWriter
+) -> QuoteResult:
+    """
+    Full workflow: validate → fetch quotes → optimize
+    Raises HTTPException for invalid shipments and unquotable routes
+    Leg planning (``determine_transport_legs``) is not on this path:
+    providers and rate cards price their own routes.
+    """
+    # Step 1: Validate
+    validation = await agent.validate_shipment(details)
+    if not validation["valid"]:
+        raise HTTPException(
+            status_code=400,
+            detail={"errors": validation["errors"], "warnings": validation["warnings"]}
+        )
+    
+    # Step 3: Fetch quotes autonomously
+    options = await agent.fetch_quotes_autonomously(details)
+    
+    if not options:
+        raise HTTPException(
+            status_code=404,
+            detail="No shipping options available for this route"
+        )
+    
+    # Step 5 & 6: Optimize and generate recommendations
+    quote_response = await agent.optimize_routes(details, options)
+    
+    # Step 7: Persist in the background
+    await writer.enqueue(details, quote_response)
+    return quote_response
 
-@router.post("/multimodal/quote")
-async def get_multimodal_quotes(details: ShipmentDetailsRequest) -> QuoteResponse:
+@router.post("/multimodal/quote", response_model=QuoteResponse)
+async def get_multimodal_quotes(
+    details: ShipmentDetailsRequest,
+    agent: FreightRateAgent = Depends(get_agent),
+    writer: QuoteWriter = Depends(get_quote_writer)
+) -> ORJSONResponse:
     """
     Get multimodal freight quotes for shipment
-    Full workflow: validate → determine legs → fetch quotes → optimize
+    Full workflow: validate → fetch quotes → optimize
     """
     try:
-        # Step 1: Validate
-        validation = await agent.validate_shipment(details)
-        if not validation["valid"]:
-            raise HTTPException(
-                status_code=400,
-                detail={"errors": validation["errors"], "warnings": validation["warnings"]}
-            )
-        
-        # Step 2: Determine transport legs
-        legs = await agent.determine_transport_legs(details)
-        
-        # Step 3: Fetch quotes autonomously
-        options = await agent.fetch_quotes_autonomously(details, legs)
-        
-        if not options:
-            raise HTTPException(
-                status_code=404,
-                detail="No shipping options available for this route"
-            )
-        
-        # Step 5 & 6: Optimize and generate recommendations
-        quote_response = await agent.optimize_routes(details, options)
+        quote_response = await run_quote_workflow(details, agent, writer)
         
         logger.info(f"Generated quotes for {details.origin} → {details.destination}")
-        return quote_response
+        return ORJSONResponse(quote_response.to_dict())
     
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Quote generation error: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating quotes: {str(e)}")
+
+def _frame(event: str, data: str, sse: bool) -> str:
+    """Encode one stream frame as an SSE event or an NDJSON line"""
+    if sse:
+        return f"event: {event}\ndata: {data}\n\n"
+    return f'{{"type": "{event}", "data": {data}}}\n'
+
+@router.post("/multimodal/quote/stream")
+async def stream_multimodal_quotes(
+    details: ShipmentDetailsRequest,
+    request: Request,
+    agent: FreightRateAgent = Depends(get_agent),
+    writer: QuoteWriter = Depends(get_quote_writer)
+) -> StreamingResponse:
+    """
+    Stream multimodal freight quotes as providers answer
+    Emits one "option" frame per shipping option, then a "summary"
+    frame holding the QuoteResponse without its options (or an "error" frame).
+    If the AI summary is still pending, a final "aiSummary" frame follows
+    once the model finishes.
+    NDJSON by default; Server-Sent Events when the client accepts text/event-stream.
+    """
+    validation = await agent.validate_shipment(details)
+    if not validation["valid"]:
+        raise HTTPException(
+            status_code=400,
+            detail={"errors": validation["errors"], "warnings": validation["warnings"]}
+        )
+    
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    
+    async def frames():
+        options = []
+        try:
+            async for batch in agent.stream_quotes(details):
+                for option in batch:
+                    options.append(option)
+                    yield _frame("option", option.to_json().decode(), sse)
+            
+            if not options:
+                error = {"status": 404, "detail": "No shipping options available for this route"}
+                yield _frame("error", json.dumps(error), sse)
+                return
+            
+            quote_response = await agent.optimize_routes(details, options)
+            await writer.enqueue(details, quote_response)
+            yield _frame("summary", quote_response.to_json(include_options=False).decode(), sse)
+            logger.info(f"Streamed quotes for {details.origin} → {details.destination}")
+            
+            if quote_response.aiSummaryStatus == PENDING:
+                request_id = quote_response.requestId
+                status, summary = await agent.summaries.wait(request_id, settings.summary_timeout) or (TEMPLATE, None)
+                data = {"requestId": request_id, "status": status, "aiSummary": summary}
+                yield _frame("aiSummary", json.dumps(data), sse)
+        
+        except Exception as e:
+            logger.error(f"Quote streaming error: {e}")
+            error = {"status": 500, "detail": f"Error generating quotes: {str(e)}"}
+            yield _frame("error", json.dumps(error), sse)
+    
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(frames(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@router.get("/multimodal/quote/{request_id}/summary", response_model=AISummaryResponse)
+async def get_ai_summary(
+    request_id: str,
+    wait: float = Query(0, ge=0, le=60),
+    summaries: SummaryService = Depends(get_summaries)
+) -> AISummaryResponse:
+    """
+    AI summary for an earlier quote
+    With ``wait`` > 0, a pending summary is awaited for up to that many seconds.
+    """
+    result = await summaries.wait(request_id, wait)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Unknown quote {request_id}")
+    status, summary = result
+    return AISummaryResponse(requestId=request_id, status=status, aiSummary=summary)
+
+@router.post("/multimodal/quote/batch", response_model=BatchQuoteResponse)
+async def get_batch_quotes(
+    request: BatchQuoteRequest,
+    agent: FreightRateAgent = Depends(get_agent),
+    writer: QuoteWriter = Depends(get_quote_writer)
+) -> ORJSONResponse:
+    """
+    Quote many shipments in one call (e.g. a tender sheet)
+    Identical items are quoted once; unique items run with bounded concurrency
+    and each item gets its own result or error.
+    """
+    if len(request.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.items)} items (max {settings.batch_max_items})"
+        )
+    
+    # Dedupe identical items; each unique item remembers where it appears
+    unique = {}
+    for index, details in enumerate(request.items):
+        key = details.model_dump_json()
+        unique.setdefault(key, (details, []))[1].append(index)
+    
+    semaphore = asyncio.Semaphore(settings.batch_concurrency)
+    
+    async def quote_one(details: ShipmentDetailsRequest):
+        # Provider calls for batch items queue behind interactive requests
+        request_priority.set(BATCH)
+        async with semaphore:
+            try:
+                return 200, await run_quote_workflow(details, agent, writer), None
+            except HTTPException as e:
+                return e.status_code, None, e.detail
+            except Exception as e:
+                logger.error(f"Batch quote error for {details.origin} → {details.destination}: {e}")
+                return 500, None, f"Error generating quotes: {str(e)}"
+    
+    outcomes = await asyncio.gather(*(quote_one(details) for details, _ in unique.values()))
+    
+    results = [None] * len(request.items)
+    for (_, indexes), (status, quote, error) in zip(unique.values(), outcomes):
+        # Duplicates share one encoded quote
+        encoded = quote.to_dict() if quote is not None else None
+        for index in indexes:
+            results[index] = {"index": index, "status": status, "quote": encoded, "error": error}
+    
+    logger.info(f"Generated batch quotes for {len(request.items)} items ({len(unique)} unique)")
+    return ORJSONResponse({"results": results, "uniqueLanes": len(unique)})
+
+@router.get("/quotes/history")
+async def get_quote_history(
+    origin: Optional[str] = None,
+    destination: Optional[str] = None,
+    mode: Optional[str] = None,
+    createdFrom: Optional[datetime] = None,
+    createdTo: Optional[datetime] = None,
+    sort: Literal["created_at", "price"] = "created_at",
+    order: Literal["asc", "desc"] = "desc",
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+) -> QuoteHistoryResponse:
+    """
+    Past quotes filtered by lane, mode and date range
+    Pass nextCursor back as cursor to fetch the following page.
+    """
+    try:
+        items, next_cursor = await query_quote_history(
+            db,
+            origin=origin,
+            destination=destination,
+            mode=mode,
+            created_from=createdFrom,
+            created_to=createdTo,
+            sort=sort,
+            order=order,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return QuoteHistoryResponse(items=items, nextCursor=next_cursor)
@@ -4,19 +4,29 @@ Uses OpenAI function calling for autonomous decision making
 """
 import os
 import json
+import asyncio
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Callable, Awaitable, AsyncIterator
 from datetime import datetime
 import random
 import string
 
-from app.models.schemas import (
-    ShipmentDetailsRequest,
-    ShippingOptionResponse,
-    TransportLegResponse,
-    QuoteResponse,
-)
+from app.models.schemas import ShipmentDetailsRequest
 from app.services.freight_providers import FreightProviders
+from app.services.options import Leg, Option, QuoteResult
+from app.services.cache import QuoteCache, lane_fingerprint
+from app.services.singleflight import SingleFlight
+from app.services.selection import select_options, pareto_frontier
+from app.services.routing import get_route_graph
+from app.services.benchmarks import LaneBenchmarks, lane_benchmarks
+from app.services.sessions import OptionSessionStore, option_sessions
+from app.services.distances import DistanceService, get_distance_service
+from app.services.emissions import EmissionsEngine, get_emissions_engine
+from app.services.rate_cards import RateCard, get_rate_card
+from app.services.summaries import SummaryService, summary_facts, TEMPLATE, PENDING
+from app.services.metrics import span, traced
+from app.services.rate_limiter import request_priority, BATCH
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -30,10 +40,32 @@ class FreightRateAgent:
     5. Generates recommendations
     """
     
-    def __init__(self):
-        self.providers = FreightProviders()
-        self.model = "gpt-4"  # OpenAI model for agentic calls
+    def __init__(
+        self,
+        providers: Optional[FreightProviders] = None,
+        cache: Optional[QuoteCache] = None,
+        benchmarks: Optional[LaneBenchmarks] = None,
+        sessions: Optional[OptionSessionStore] = None,
+        distances: Optional[DistanceService] = None,
+        emissions: Optional[EmissionsEngine] = None,
+        rates: Optional[RateCard] = None,
+        summaries: Optional[SummaryService] = None
+    ):
+        self.providers = providers or FreightProviders()
+        self.cache = cache or QuoteCache()
+        self.benchmarks = benchmarks or lane_benchmarks
+        self.sessions = sessions if sessions is not None else option_sessions
+        self.distances = distances or get_distance_service()
+        self.emissions = emissions or get_emissions_engine()
+        self.rates = rates or get_rate_card()
+        self.summaries = summaries or SummaryService()
+        self.inflight = SingleFlight()
         
+    async def aclose(self):
+        """Release resources held by the agent"""
+        await self.cache.aclose()
+    
+    @traced("validate")
     async def validate_shipment(self, details: ShipmentDetailsRequest) -> Dict[str, Any]:
         """Step 1: Validate & Normalize Input"""
         warnings = []
@@ -72,8 +104,45 @@ class FreightRateAgent:
             "errors": errors,
         }
     
-    async def determine_transport_legs(self, details: ShipmentDetailsRequest) -> List[Dict[str, str]]:
-        """Step 2: Determine Required Transport Segments"""
+    @traced("determine_legs")
+    async def determine_transport_legs(self, details: ShipmentDetailsRequest) -> List[Dict[str, Any]]:
+        """
+        Step 2: Determine Required Transport Segments
+        
+        Uses the legs of the cheapest planned route in each route family
+        (tagged with ``option``); falls back to fixed templates when the
+        origin or destination is not on the route network. The search runs
+        in a worker thread so a cold lane does not stall the event loop;
+        the quote workflows do not wait for it.
+        """
+        routes = await asyncio.to_thread(self.plan_routes, details)
+        if not routes:
+            return self._template_legs(details)
+        
+        legs = []
+        families = set()
+        for route in routes:
+            if route["mode"] in families:
+                continue
+            families.add(route["mode"])
+            legs.extend({**leg, "option": route["mode"]} for leg in route["legs"])
+        
+        return legs
+    
+    def plan_routes(self, details: ShipmentDetailsRequest, k: int = 3) -> List[Dict[str, Any]]:
+        """Candidate multimodal routes from the route graph, cheapest first"""
+        weight_tons = details.weight if details.weightUnit == "tons" else details.weight / 1000
+        return get_route_graph().plan(
+            details.origin,
+            details.destination,
+            details.shipmentTypes,
+            weight_tons,
+            details.volume,
+            k=k,
+        )
+    
+    def _template_legs(self, details: ShipmentDetailsRequest) -> List[Dict[str, Any]]:
+        """Fixed leg templates for locations the route graph does not know"""
         legs = []
         
         # Simple leg determination logic based on shipment types
@@ -97,7 +166,7 @@ class FreightRateAgent:
                 "duration": "1-2 days"
             })
         
-        elif "Air Cargo" in details.shipmentTypes:
+        if "Air Cargo" in details.shipmentTypes:
             legs.append({
                 "mode": "Truck",
                 "origin": details.origin,
@@ -117,7 +186,7 @@ class FreightRateAgent:
                 "duration": "1 day"
             })
         
-        elif "FTL Trucking" in details.shipmentTypes or "LTL Trucking" in details.shipmentTypes:
+        if "FTL Trucking" in details.shipmentTypes or "LTL Trucking" in details.shipmentTypes:
             legs.append({
                 "mode": "Truck",
                 "origin": details.origin,
@@ -127,82 +196,290 @@ class FreightRateAgent:
         
         return legs
     
+    @traced("fetch_quotes")
     async def fetch_quotes_autonomously(
         self, 
         details: ShipmentDetailsRequest,
-        transport_legs: List[Dict[str, str]]
-    ) -> List[ShippingOptionResponse]:
-        """Step 3: Fetch Quotes Autonomously from Multiple Providers"""
+        transport_legs: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Option]:
+        """
+        Step 3: Fetch Quotes Autonomously from Multiple Providers
+
+        A contracted rate card covering every requested mode prices the
+        shipment directly. Otherwise quotes are served from the lane cache
+        when fresh, or providers are queried and the result is cached if
+        every provider answered. Concurrent requests for the same lane share
+        a single provider fetch.
+
+        Rate-card quotes are priced on the shipment's exact weight,
+        insurance and customs, which the lane fingerprint leaves out, so
+        they are never cached or shared between requests.
+        """
+        contracted = self._contracted_quotes(details)
+        if contracted is not None:
+            return contracted
+        
+        cached = await self.cache.get(details)
+        if cached is not None:
+            return cached
+        
+        quotes = await self.inflight.do(
+            lane_fingerprint(details),
+            lambda: self._fetch_and_cache(details)
+        )
+        if quotes is None:
+            return await self._fallback_quotes(details)
+        return list(quotes)
+    
+    async def _fetch_and_cache(self, details: ShipmentDetailsRequest) -> Optional[List[Option]]:
+        """Fetch quotes from providers and cache them if every provider answered"""
+        quotes, complete = await self._fetch_from_providers(details)
+        if complete and quotes is not None:
+            await self.cache.set(details, quotes)
+        
+        return quotes
+    
+    async def stream_quotes(
+        self,
+        details: ShipmentDetailsRequest
+    ) -> AsyncIterator[List[Option]]:
+        """
+        Step 3, streamed: yield each provider's quotes as soon as they arrive
+        
+        Contracted rate-card quotes and cache hits are yielded as one batch.
+        Rate-card (or mock) quotes are yielded only if no provider returned
+        a quote; complete provider results are cached as in
+        ``fetch_quotes_autonomously``.
+        """
+        contracted = self._contracted_quotes(details)
+        if contracted is not None:
+            yield self.emissions.annotate(details, contracted)
+            return
+        
+        cached = await self.cache.get(details)
+        if cached is not None:
+            yield self.emissions.annotate(details, cached)
+            return
+        
+        calls = self._provider_calls(details)
         quotes = []
+        failed = 0
+        async for name, batch, error in self._iter_provider_results(details, calls):
+            if error is not None:
+                failed += 1
+                continue
+            self.distances.fill_routes(batch)
+            quotes.extend(batch)
+            if batch:
+                # Streamed options carry their footprint; the cached ones stay as quoted
+                yield self.emissions.annotate(details, batch)
         
-        try:
-            # Query each provider based on shipment type
-            if any("Ocean" in t for t in details.shipmentTypes):
-                ocean_quotes = await self.providers.get_ocean_freight_quotes(details)
-                quotes.extend(ocean_quotes)
-            
-            if "Air Cargo" in details.shipmentTypes:
-                air_quotes = await self.providers.get_air_freight_quotes(details)
-                quotes.extend(air_quotes)
-            
-            if "FTL Trucking" in details.shipmentTypes or "LTL Trucking" in details.shipmentTypes:
-                land_quotes = await self.providers.get_land_freight_quotes(details)
-                quotes.extend(land_quotes)
+        if not quotes:
+            yield self.emissions.annotate(details, await self._fallback_quotes(details))
+        elif failed == 0:
+            await self.cache.set(details, quotes)
+    
+    @traced("fetch_quotes.providers")
+    async def _fetch_from_providers(
+        self,
+        details: ShipmentDetailsRequest
+    ) -> Tuple[Optional[List[Option]], bool]:
+        """
+        Query all applicable providers concurrently
         
-        except Exception as e:
-            logger.error(f"Error fetching quotes: {e}")
-            # Fallback to mock data
-            quotes = await self._generate_mock_quotes(details)
+        Quotes from providers that answered are kept even if others fail.
+        Returns the quotes and whether they are complete; the quotes are
+        None when no provider is configured or none returned a quote,
+        leaving each caller to price its own fallback.
+        """
+        calls = self._provider_calls(details)
+        if not calls:
+            return None, False
+
+        results = {}
+        async for name, batch, error in self._iter_provider_results(details, calls):
+            if error is None:
+                results[name] = batch
         
+        # Keep provider order stable regardless of completion order
+        quotes = [quote for name in calls if name in results for quote in results[name]]
+        if not quotes:
+            return None, False
+        # Leg distances for every option in one batched call
+        self.distances.fill_routes(quotes)
+        return quotes, len(results) == len(calls)
+    
+    def _contracted_quotes(self, details: ShipmentDetailsRequest) -> Optional[List[Option]]:
+        """Quotes from a contracted rate card covering every requested mode, else None"""
+        if not (settings.rate_card_fast_path and self.rates.contracted):
+            return None
+        with span("fetch_quotes.rate_card"):
+            quotes = self.rates.quote(details)
+        if not quotes or not set(details.shipmentTypes) <= {quote.mode for quote in quotes}:
+            return None
+        self.distances.fill_routes(quotes)
+        return quotes
+    
+    async def _fallback_quotes(self, details: ShipmentDetailsRequest) -> List[Option]:
+        """Rate-card quotes when no provider returned a quote; mock quotes for lanes off the card"""
+        quotes = self.rates.quote(details) or await self._generate_mock_quotes(details)
+        self.distances.fill_routes(quotes)
         return quotes
     
+    async def _iter_provider_results(
+        self,
+        details: ShipmentDetailsRequest,
+        calls: Dict[str, Callable[[ShipmentDetailsRequest], Awaitable[List[Option]]]]
+    ) -> AsyncIterator[Tuple[str, Optional[List[Option]], Optional[Exception]]]:
+        """
+        Run provider calls concurrently, yielding (name, quotes, error) as each finishes
+        
+        Each call is bounded by ``settings.provider_timeout`` and the whole
+        fan-out by ``settings.quote_deadline``. Calls still running at the
+        deadline are cancelled and reported as timeouts.
+        """
+        async def timed(name, call):
+            with span(f"provider.{name}"):
+                return await asyncio.wait_for(call(details), timeout=settings.provider_timeout)
+        
+        tasks = {asyncio.ensure_future(timed(name, call)): name for name, call in calls.items()}
+        pending = set(tasks)
+        deadline = asyncio.get_running_loop().time() + settings.quote_deadline
+
+        try:
+            while pending:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    name = tasks[task]
+                    try:
+                        yield name, task.result(), None
+                    except asyncio.TimeoutError as e:
+                        logger.warning(f"Provider {name} timed out")
+                        yield name, None, e
+                    except Exception as e:
+                        logger.error(f"Error fetching {name} quotes: {e}")
+                        yield name, None, e
+            
+            for task in pending:
+                name = tasks[task]
+                logger.warning(f"Provider {name} missed the quote deadline")
+                yield name, None, asyncio.TimeoutError(f"{name} missed the quote deadline")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _provider_calls(
+        self,
+        details: ShipmentDetailsRequest
+    ) -> Dict[str, Callable[[ShipmentDetailsRequest], Awaitable[List[Option]]]]:
+        """
+        Select the provider calls applicable to the requested shipment types
+        Providers without an API key are left out rather than counted as
+        answering with no quotes.
+        """
+        calls = {}
+
+        if any("Ocean" in t for t in details.shipmentTypes) and self.providers.configured("ocean"):
+            calls["ocean"] = self.providers.get_ocean_freight_quotes
+
+        if "Air Cargo" in details.shipmentTypes and self.providers.configured("air"):
+            calls["air"] = self.providers.get_air_freight_quotes
+
+        if (
+            ("FTL Trucking" in details.shipmentTypes or "LTL Trucking" in details.shipmentTypes)
+            and self.providers.configured("land")
+        ):
+            calls["land"] = self.providers.get_land_freight_quotes
+
+        return calls
+    
+    @traced("optimize")
     async def optimize_routes(
         self,
         details: ShipmentDetailsRequest,
-        options: List[ShippingOptionResponse]
-    ) -> QuoteResponse:
+        options: List[Option]
+    ) -> QuoteResult:
         """Step 5 & 6: Optimize Using Constraints & Generate Recommendations"""
         
-        # Sort by price
-        cheapest = min(options, key=lambda x: x.price)
+        # Per-leg and total CO2e for the shipment's actual weight
+        with span("optimize.emissions"):
+            options = self.emissions.annotate(details, options)
         
-        # Sort by transit time
-        fastest = min(options, key=lambda x: x.transitDays)
+        # Place each option against recent market rates for the lane
+        with span("optimize.benchmarks"):
+            options, benchmarks = await self.benchmarks.annotate(details, options)
         
-        # Best value: price-to-speed ratio
-        best_value = min(
-            options,
-            key=lambda x: x.price / max(x.transitDays, 1)
-        )
+        # Cheapest, fastest and best value (price-to-speed ratio) in one pass
+        cheapest, fastest, best_value = select_options(options)
         
-        # Generate AI summary
-        ai_summary = self._generate_ai_summary(
-            details=details,
-            cheapest=cheapest,
-            fastest=fastest,
-            best_value=best_value
-        )
+        # Non-dominated trade-offs across price, speed, carbon and reliability
+        frontier = pareto_frontier(options)
         
         # Generate unique request ID
         request_id = self._generate_request_id()
         
-        return QuoteResponse(
+        # Template summary now; the model summary follows in the background
+        ai_summary, summary_status = await self._ai_summary(
+            request_id, details, cheapest, fastest, best_value
+        )
+        
+        # Keep the options so recommend can re-rank them by requestId; batch
+        # items are skipped so a large tender cannot evict interactive sessions
+        if request_priority.get() != BATCH:
+            self.sessions.put(request_id, details, options)
+        
+        return QuoteResult(
             cheapest=cheapest,
             fastest=fastest,
             bestValue=best_value,
             options=options,
+            paretoFrontier=frontier,
+            marketBenchmarks=benchmarks,
             aiSummary=ai_summary,
-            requestId=request_id
+            requestId=request_id,
+            aiSummaryStatus=summary_status
+        )
+    
+    async def _ai_summary(
+        self,
+        request_id: str,
+        details: ShipmentDetailsRequest,
+        cheapest: Option,
+        fastest: Option,
+        best_value: Option
+    ) -> Tuple[str, str]:
+        """
+        Summary text and its status for a quote
+        
+        A cached model summary is used directly; otherwise generation starts
+        in the background and the template summary is returned, after
+        waiting at most ``settings.summary_inline_deadline`` for the model.
+        Batch items keep the template: nobody polls for their summaries.
+        """
+        template = self._generate_ai_summary(details, cheapest, fastest, best_value)
+        if not self.summaries.enabled or request_priority.get() == BATCH:
+            return template, TEMPLATE
+        
+        status, summary = self.summaries.submit(
+            request_id, summary_facts(details, cheapest, fastest, best_value)
         )
+        if status == PENDING and settings.summary_inline_deadline > 0:
+            status, summary = await self.summaries.wait(request_id, settings.summary_inline_deadline)
+        return summary or template, status
     
     def _generate_ai_summary(
         self,
         details: ShipmentDetailsRequest,
-        cheapest: ShippingOptionResponse,
-        fastest: ShippingOptionResponse,
-        best_value: ShippingOptionResponse
+        cheapest: Option,
+        fastest: Option,
+        best_value: Option
     ) -> str:
-        """Generate AI-powered summary of recommendations"""
+        """Template summary of the recommendations, returned while the model summary is pending"""
         
         summary = f"""
         Based on your shipment requirements ({details.weight} {details.weightUnit} of {details.commodity}):
@@ -225,84 +502,83 @@ class FreightRateAgent:
         random_suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
         return f"RQ-{timestamp}-{random_suffix}"
     
+    @traced("mock_quotes")
     async def _generate_mock_quotes(
         self,
         details: ShipmentDetailsRequest
-    ) -> List[ShippingOptionResponse]:
+    ) -> List[Option]:
         """Generate realistic mock quotes for testing"""
         
         mock_quotes = []
         
         # Ocean freight mock
         if any("Ocean" in t for t in details.shipmentTypes):
-            mock_quotes.append(ShippingOptionResponse(
+            mock_quotes.append(Option(
                 mode="Ocean (FCL)",
                 price=1450.00,
                 transitDays=32,
                 route=[
-                    TransportLegResponse(
+                    Leg(
                         mode="Truck",
                         origin=details.origin,
                         destination=f"{details.origin} Port",
                         duration="2 days"
                     ),
-                    TransportLegResponse(
+                    Leg(
                         mode="Ocean",
                         origin=f"{details.origin} Port",
                         destination=f"{details.destination} Port",
                         duration="28 days",
                         carrier="Maersk"
                     ),
-                    TransportLegResponse(
+                    Leg(
                         mode="Truck",
                         origin=f"{details.destination} Port",
                         destination=details.destination,
                         duration="2 days"
                     )
                 ],
-                carbonFootprint=250.0,
                 reliability=0.92
             ))
         
         # Air freight mock
         if "Air Cargo" in details.shipmentTypes:
-            mock_quotes.append(ShippingOptionResponse(
+            mock_quotes.append(Option(
                 mode="Air Cargo",
                 price=4200.00,
                 transitDays=5,
                 route=[
-                    TransportLegResponse(
+                    Leg(
                         mode="Truck",
                         origin=details.origin,
                         destination=f"{details.origin} Airport",
                         duration="1 day"
                     ),
-                    TransportLegResponse(
+                    Leg(
                         mode="Air",
                         origin=f"{details.origin} Airport",
                         destination=f"{details.destination} Airport",
                         duration="3 days",
                         carrier="KLM Cargo"
                     ),
-                    TransportLegResponse(
+                    Leg(
                         mode="Truck",
                         origin=f"{details.destination} Airport",
                         destination=details.destination,
                         duration="1 day"
                     )
                 ],
-                carbonFootprint=1200.0,
                 reliability=0.98
             ))
         
         # Land freight mock
         if "FTL Trucking" in details.shipmentTypes or "LTL Trucking" in details.shipmentTypes:
-            mock_quotes.append(ShippingOptionResponse(
+            mock_quotes.append(Option(
                 mode="FTL Trucking",
                 price=2200.00,
                 transitDays=7,
                 route=[
-                    TransportLegResponse(
+                    Leg(
                         mode="Truck",
                         origin=details.origin,
                         destination=details.destination,
@@ -310,7 +586,6 @@ class FreightRateAgent:
                         carrier="Premium Logistics"
                     )
                 ],
-                carbonFootprint=350.0,
                 reliability=0.95
             ))
         
@@ -0,0 +1,255 @@
+"""
+Lane rate benchmarks
+Daily price histograms per lane, mode and weight band, rolled up into
+market stats (median, p10/p90, trend) that quotes are compared against
+"""
+import math
+import time
+import logging
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple
+
+import numpy as np
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.database import LaneRateDaily, LaneRateBenchmark
+from app.models.schemas import ShipmentDetailsRequest, LaneBenchmarkResponse
+from app.services.options import Option
+from app.services.cache import weight_band
+from app.services.locations import location_code
+
+logger = logging.getLogger(__name__)
+
+# Log-spaced price bins: 20 per decade from $10 to $10M (~12% wide each)
+PRICE_FLOOR = 10.0
+BINS_PER_DECADE = 20
+HISTOGRAM_BINS = 6 * BINS_PER_DECADE
+BIN_EDGES = PRICE_FLOOR * 10 ** (np.arange(HISTOGRAM_BINS + 1) / BINS_PER_DECADE)
+
+BucketKey = Tuple[str, str, str, int]
+
+def _bin_position(price: float) -> float:
+    return math.log10(max(price, 1e-9) / PRICE_FLOOR) * BINS_PER_DECADE
+
+def price_bins(prices: List[float]) -> np.ndarray:
+    """Histogram counts for a list of prices"""
+    positions = np.floor([_bin_position(p) for p in prices]).astype(int)
+    return np.bincount(np.clip(positions, 0, HISTOGRAM_BINS - 1), minlength=HISTOGRAM_BINS)
+
+def histogram_quantile(counts: np.ndarray, q: float) -> Optional[float]:
+    """Quantile of a price histogram, interpolated geometrically within its bin"""
+    total = counts.sum()
+    if total == 0:
+        return None
+    cumulative = np.cumsum(counts)
+    target = q * total
+    i = min(int(np.searchsorted(cumulative, target)), HISTOGRAM_BINS - 1)
+    before = cumulative[i - 1] if i else 0
+    fraction = (target - before) / counts[i] if counts[i] else 0.0
+    low, high = BIN_EDGES[i], BIN_EDGES[i + 1]
+    return round(float(low * (high / low) ** fraction), 2)
+
+def percentile_of(cdf: List[float], price: float) -> float:
+    """Share of the market (0-100) quoted at or below ``price``"""
+    position = _bin_position(price)
+    if position <= 0:
+        return 0.0
+    i = int(position)
+    if i >= HISTOGRAM_BINS:
+        return 100.0
+    before = cdf[i - 1] if i else 0.0
+    return round(100 * (before + (position - i) * (cdf[i] - before)), 1)
+
+def _summarize(days: List[LaneRateDaily], today: date) -> Dict[str, Any]:
+    """Benchmark fields from the daily buckets inside the window"""
+    recent_start = today - timedelta(days=settings.benchmark_trend_days - 1)
+    recent = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+    earlier = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+    for bucket in days:
+        counts = np.asarray(bucket.histogram, dtype=np.int64)
+        if bucket.day >= recent_start:
+            recent += counts
+        else:
+            earlier += counts
+
+    counts = recent + earlier
+    total = int(counts.sum())
+    recent_median = histogram_quantile(recent, 0.5)
+    earlier_median = histogram_quantile(earlier, 0.5)
+    trend = None
+    if recent_median is not None and earlier_median is not None:
+        # Relative change of the recent median against the rest of the window
+        trend = round(recent_median / earlier_median - 1, 4)
+
+    return {
+        "sample_count": total,
+        "median": histogram_quantile(counts, 0.5),
+        "p10": histogram_quantile(counts, 0.1),
+        "p90": histogram_quantile(counts, 0.9),
+        "trend": trend,
+        "cdf": (np.cumsum(counts) / total).round(5).tolist() if total else [],
+    }
+
+BUCKET_KEY = ("origin_code", "destination_code", "mode", "weight_band", "day")
+BENCHMARK_KEY = ("origin_code", "destination_code", "weight_band", "mode")
+
+def _insert(session: AsyncSession, model):
+    """INSERT with ON CONFLICT support for the session's dialect (PostgreSQL or SQLite)"""
+    if session.bind.dialect.name == "postgresql":
+        return postgresql_insert(model)
+    return sqlite_insert(model)
+
+async def record_quote_rows(session: AsyncSession, rows: List[Dict[str, Any]]):
+    """
+    Fold persisted quote rows into the daily buckets and refresh the
+    benchmarks of every touched (lane, mode, band)
+
+    Safe to run from several workers at once: missing buckets are created
+    with INSERT ... ON CONFLICT DO NOTHING, so every bucket exists before it
+    is locked and merged, and benchmarks are written with ON CONFLICT DO
+    UPDATE. Each flush costs three indexed reads regardless of batch size.
+    """
+    grouped: Dict[Tuple[BucketKey, date], List[float]] = defaultdict(list)
+    for row in rows:
+        if not row.get("mode") or row.get("weight_band") is None or not row.get("price"):
+            continue
+        key = (row["origin_code"], row["destination_code"], row["mode"], row["weight_band"])
+        grouped[(key, row["created_at"].date())].append(row["price"])
+    if not grouped:
+        return
+
+    # Daily buckets: create the missing ones, then lock all in key order and merge
+    await session.execute(
+        _insert(session, LaneRateDaily)
+        .values([
+            {**dict(zip(BUCKET_KEY, (*key, day))), "count": 0, "price_sum": 0.0,
+             "histogram": [0] * HISTOGRAM_BINS}
+            for key, day in sorted(grouped)
+        ])
+        .on_conflict_do_nothing(index_elements=BUCKET_KEY)
+    )
+    bucket_columns = tuple_(*(getattr(LaneRateDaily, column) for column in BUCKET_KEY))
+    existing = await session.execute(
+        select(LaneRateDaily)
+        .where(bucket_columns.in_([(*key, day) for key, day in grouped]))
+        .order_by(*(getattr(LaneRateDaily, column) for column in BUCKET_KEY))
+        .with_for_update()
+    )
+    buckets = {
+        ((b.origin_code, b.destination_code, b.mode, b.weight_band), b.day): b
+        for b in existing.scalars()
+    }
+    for (key, day), prices in grouped.items():
+        bucket = buckets[(key, day)]
+        bucket.count += len(prices)
+        bucket.price_sum += sum(prices)
+        bucket.price_min = min(prices) if bucket.price_min is None else min(bucket.price_min, *prices)
+        bucket.price_max = max(prices) if bucket.price_max is None else max(bucket.price_max, *prices)
+        bucket.histogram = (np.asarray(bucket.histogram) + price_bins(prices)).tolist()
+    await session.flush()
+
+    # Roll the window of each touched key up into its benchmark row; days
+    # are UTC, like the quotes' created_at
+    now = datetime.utcnow()
+    today = now.date()
+    window_start = today - timedelta(days=settings.benchmark_window_days - 1)
+    keys = sorted({key for key, _ in grouped})
+    key_columns = tuple_(
+        LaneRateDaily.origin_code, LaneRateDaily.destination_code,
+        LaneRateDaily.mode, LaneRateDaily.weight_band,
+    )
+    window = await session.execute(
+        select(LaneRateDaily).where(key_columns.in_(keys), LaneRateDaily.day >= window_start)
+    )
+    days: Dict[BucketKey, List[LaneRateDaily]] = defaultdict(list)
+    for bucket in window.scalars():
+        days[(bucket.origin_code, bucket.destination_code, bucket.mode, bucket.weight_band)].append(bucket)
+
+    upsert = _insert(session, LaneRateBenchmark).values([
+        {"origin_code": key[0], "destination_code": key[1], "mode": key[2], "weight_band": key[3],
+         "updated_at": now, **_summarize(days[key], today)}
+        for key in keys
+    ])
+    fields = ("sample_count", "median", "p10", "p90", "trend", "cdf", "updated_at")
+    await session.execute(
+        upsert.on_conflict_do_update(
+            index_elements=BENCHMARK_KEY,
+            set_={field: getattr(upsert.excluded, field) for field in fields},
+        )
+    )
+
+class LaneBenchmarks:
+    """
+    Read side of the benchmarks: one indexed read per (lane, weight band),
+    memoized for ``benchmark_cache_ttl`` seconds
+    """
+
+    def __init__(self, session_factory=SessionLocal, max_entries: int = 4096):
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, int], Tuple[float, Dict[str, LaneBenchmarkResponse], Dict[str, List[float]]]]" = OrderedDict()
+
+    async def lookup(self, details: ShipmentDetailsRequest) -> Tuple[Dict[str, LaneBenchmarkResponse], Dict[str, List[float]]]:
+        """Benchmarks and CDFs by mode for a shipment's lane and weight band"""
+        key = (location_code(details.origin), location_code(details.destination), weight_band(details))
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+        stats: Dict[str, LaneBenchmarkResponse] = {}
+        cdfs: Dict[str, List[float]] = {}
+        try:
+            async with self.session_factory() as session:
+                result = await session.execute(
+                    select(LaneRateBenchmark).where(
+                        LaneRateBenchmark.origin_code == key[0],
+                        LaneRateBenchmark.destination_code == key[1],
+                        LaneRateBenchmark.weight_band == key[2],
+                        LaneRateBenchmark.sample_count >= settings.benchmark_min_samples,
+                    )
+                )
+                for benchmark in result.scalars():
+                    stats[benchmark.mode] = LaneBenchmarkResponse(
+                        mode=benchmark.mode,
+                        sampleCount=benchmark.sample_count,
+                        median=benchmark.median,
+                        p10=benchmark.p10,
+                        p90=benchmark.p90,
+                        trend=benchmark.trend,
+                    )
+                    cdfs[benchmark.mode] = benchmark.cdf
+        except Exception as e:
+            # Benchmarks are advisory; quoting goes on without them
+            logger.error(f"Lane benchmark lookup failed: {e}")
+
+        self._entries[key] = (time.monotonic() + settings.benchmark_cache_ttl, stats, cdfs)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return stats, cdfs
+
+    async def annotate(
+        self,
+        details: ShipmentDetailsRequest,
+        options: List[Option]
+    ) -> Tuple[List[Option], List[LaneBenchmarkResponse]]:
+        """Copies of the options carrying their market percentile, plus the lane benchmarks"""
+        stats, cdfs = await self.lookup(details)
+        if not stats:
+            return options, []
+        annotated = [
+            option.replace(marketPercentile=percentile_of(cdfs[option.mode], option.price))
+            if option.mode in cdfs else option
+            for option in options
+        ]
+        return annotated, list(stats.values())
+
+# Process-wide benchmark reader
+lane_benchmarks = LaneBenchmarks()
@@ -0,0 +1,169 @@
+"""
+Lane-level quote cache
+Caches provider quotes per normalized shipment lane with per-mode TTLs
+"""
+import json
+import time
+import bisect
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
+
+import orjson
+
+from app.models.schemas import ShipmentDetailsRequest
+from app.services.options import Option
+from app.services.locations import location_code
+from app.services.metrics import record_cache_lookup
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Band upper bounds; quotes are shared by every shipment inside a band
+WEIGHT_BANDS_KG = [45, 100, 250, 500, 1000, 2000, 5000, 10000, 20000]
+VOLUME_BANDS_CBM = [1, 2, 5, 10, 15, 20, 33, 67]
+
+def weight_band(details: ShipmentDetailsRequest) -> int:
+    """Index of the weight band a shipment falls into"""
+    weight_kg = details.weight * 1000 if details.weightUnit == "tons" else details.weight
+    return bisect.bisect_left(WEIGHT_BANDS_KG, weight_kg)
+
+def lane_fingerprint(details: ShipmentDetailsRequest) -> str:
+    """Stable cache key for the lane and cargo profile of a shipment"""
+    lane = {
+        "origin": location_code(details.origin),
+        "destination": location_code(details.destination),
+        "types": sorted(set(details.shipmentTypes)),
+        "weight": weight_band(details),
+        "volume": bisect.bisect_left(VOLUME_BANDS_CBM, details.volume),
+        "hazardous": details.hazardous,
+        "temperatureControlled": details.temperatureControlled,
+    }
+    raw = json.dumps(lane, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def lane_ttl(details: ShipmentDetailsRequest) -> float:
+    """TTL for a lane: the shortest TTL among its requested modes"""
+    ttls = []
+    if any("Ocean" in t for t in details.shipmentTypes):
+        ttls.append(settings.quote_cache_ttl_ocean)
+    if "Air Cargo" in details.shipmentTypes:
+        ttls.append(settings.quote_cache_ttl_air)
+    if "FTL Trucking" in details.shipmentTypes or "LTL Trucking" in details.shipmentTypes:
+        ttls.append(settings.quote_cache_ttl_land)
+    return min(ttls) if ttls else 0
+
+class CacheBackend:
+    """Storage interface for cached quote lists"""
+
+    async def get(self, key: str) -> Optional[List[Option]]:
+        raise NotImplementedError
+
+    async def set(self, key: str, options: List[Option], ttl: float):
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+class InMemoryCacheBackend(CacheBackend):
+    """Per-process LRU cache with expiry"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, List[Option]]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[List[Option]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, options = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return list(options)
+
+    async def set(self, key: str, options: List[Option], ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, list(options))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisCacheBackend(CacheBackend):
+    """Shared cache for multi-worker deployments (requires the ``redis`` package)"""
+
+    def __init__(self, url: str, prefix: str = "quotes:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("QUOTE_CACHE_BACKEND=redis requires the 'redis' package") from e
+        self._redis = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[List[Option]]:
+        raw = await self._redis.get(self.prefix + key)
+        if raw is None:
+            return None
+        return [Option.from_dict(item) for item in orjson.loads(raw)]
+
+    async def set(self, key: str, options: List[Option], ttl: float):
+        raw = orjson.dumps([o.to_dict() for o in options])
+        await self._redis.set(self.prefix + key, raw, px=int(ttl * 1000))
+
+    async def aclose(self):
+        await self._redis.aclose()
+
+class QuoteCache:
+    """Lane-keyed quote cache with hit/miss counters"""
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend if backend is not None else self._backend_from_settings()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _backend_from_settings() -> CacheBackend:
+        if settings.quote_cache_backend == "redis":
+            return RedisCacheBackend(settings.redis_url)
+        return InMemoryCacheBackend(settings.quote_cache_max_entries)
+
+    async def get(self, details: ShipmentDetailsRequest) -> Optional[List[Option]]:
+        """Look up cached quotes for a shipment's lane"""
+        try:
+            options = await self.backend.get(lane_fingerprint(details))
+        except Exception as e:
+            logger.error(f"Quote cache read failed: {e}")
+            options = None
+
+        if options is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        record_cache_lookup(options is not None)
+        return options
+
+    async def set(self, details: ShipmentDetailsRequest, options: List[Option]):
+        """Store quotes for a shipment's lane using its mode TTL"""
+        ttl = lane_ttl(details)
+        if ttl <= 0 or not options:
+            return
+        try:
+            await self.backend.set(lane_fingerprint(details), options, ttl)
+        except Exception as e:
+            logger.error(f"Quote cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": self.hits / total if total else 0.0,
+        }
+
+    async def aclose(self):
+        await self.backend.aclose()
@@ -0,0 +1,193 @@
+"""
+Leg distances
+Great-circle distances with per-mode detour factors for air, road and rail,
+and sea-lane distances from a port-to-port matrix that is precomputed over
+the waypoint graph in network.json and memory-mapped from disk
+"""
+import os
+import json
+import heapq
+import hashlib
+import logging
+import tempfile
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.services.options import Option
+from app.services.locations import resolve_location
+from app.services.routing import (
+    NETWORK_PATH, MODE_PROFILES, LOCAL_DRAYAGE_KM, TRUCK, RAIL, OCEAN, AIR,
+)
+from app.utils.helpers import great_circle_km, great_circle_km_array
+
+logger = logging.getLogger(__name__)
+
+# Terminal names used in legs ("Shanghai Port") resolve to their city
+TERMINAL_SUFFIXES = (" Rail Terminal", " Airport", " Port")
+
+MODE_KEYWORDS = (("ocean", OCEAN), ("sea", OCEAN), ("air", AIR), ("rail", RAIL))
+
+@lru_cache(maxsize=256)
+def mode_code(mode: str) -> int:
+    """Routing mode for a leg or option mode name ("Ocean (FCL)" -> OCEAN); road otherwise"""
+    mode = mode.lower()
+    for keyword, code in MODE_KEYWORDS:
+        if keyword in mode:
+            return code
+    return TRUCK
+
+def sea_lane_matrix(network: Dict) -> Tuple[List[str], np.ndarray]:
+    """
+    Port codes and their all-pairs sea-lane km
+
+    Shortest paths over the ``sea_lanes`` graph, whose links are great-circle
+    hops between ports and waypoints (straits, canals, capes). Pairs with no
+    sea connection are infinite.
+    """
+    ports = [city["code"] for city in network["cities"] if city.get("port")]
+    coords = {city["code"]: (city["lat"], city["lon"]) for city in network["cities"]}
+    coords.update({name: tuple(point) for name, point in network["sea_lanes"]["waypoints"].items()})
+
+    adjacency: Dict[str, List[Tuple[str, float]]] = defaultdict(list)
+    for a, b in network["sea_lanes"]["links"]:
+        km = great_circle_km(*coords[a], *coords[b])
+        adjacency[a].append((b, km))
+        adjacency[b].append((a, km))
+
+    matrix = np.full((len(ports), len(ports)), np.inf, dtype=np.float32)
+    for i, port in enumerate(ports):
+        # Dijkstra from each port; the graph has well under a hundred nodes
+        settled: Dict[str, float] = {}
+        heap = [(0.0, port)]
+        while heap:
+            km, node = heapq.heappop(heap)
+            if node in settled:
+                continue
+            settled[node] = km
+            for neighbour, hop in adjacency[node]:
+                if neighbour not in settled:
+                    heapq.heappush(heap, (km + hop, neighbour))
+        for j, other in enumerate(ports):
+            matrix[i, j] = settled.get(other, np.inf)
+    return ports, matrix
+
+def _load_matrix(path: Path, network: Dict, size: int) -> np.ndarray:
+    """Memory-map the matrix at ``path``, building and saving it first if missing"""
+    try:
+        matrix = np.load(path, mmap_mode="r")
+        if matrix.shape == (size, size):
+            return matrix
+    except (OSError, ValueError):
+        pass
+
+    _, matrix = sea_lane_matrix(network)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent workers never map a partial file
+        partial = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(partial, "wb") as f:
+            np.save(f, matrix)
+        os.replace(partial, path)
+        return np.load(path, mmap_mode="r")
+    except OSError as e:
+        logger.warning(f"Could not save sea-lane matrix to {path}, keeping it in memory: {e}")
+        return matrix
+
+class DistanceService:
+    """
+    Vectorized leg distances
+
+    Each distinct place name is resolved once (memoized); the distance math
+    for a whole batch of legs then runs as NumPy array operations. Ocean legs
+    between known ports read the sea-lane matrix; other legs use great-circle
+    km times the mode's detour factor. Legs within one city count as local
+    drayage.
+    """
+
+    def __init__(self, ports: List[str], sea_km: np.ndarray, cache_size: int = 8192):
+        self.port_index = {code: i for i, code in enumerate(ports)}
+        self.sea_km = sea_km
+        self.detour = np.array([MODE_PROFILES[mode]["detour"] for mode in range(4)])
+        self.place = lru_cache(maxsize=cache_size)(self._place)
+
+    @classmethod
+    def load(cls, path: Path = NETWORK_PATH, matrix_dir: Optional[str] = None) -> "DistanceService":
+        """Build the service from the bundled network, reusing a saved matrix for the same network file"""
+        raw = path.read_bytes()
+        network = json.loads(raw)
+        ports = [city["code"] for city in network["cities"] if city.get("port")]
+        digest = hashlib.sha1(raw).hexdigest()[:12]
+        directory = Path(matrix_dir or settings.distance_matrix_dir or tempfile.gettempdir())
+        sea_km = _load_matrix(directory / f"sea_lanes_{digest}.npy", network, len(ports))
+        logger.info(f"Sea-lane matrix loaded: {len(ports)} ports")
+        return cls(ports, sea_km)
+
+    def _place(self, name: str) -> Optional[Tuple[float, float, str, int]]:
+        """(lat, lon, locode, port index or -1) for a leg endpoint"""
+        for suffix in TERMINAL_SUFFIXES:
+            if name.endswith(suffix):
+                name = name[:-len(suffix)]
+                break
+        location = resolve_location(name)
+        if location is None:
+            return None
+        return location.lat, location.lon, location.locode, self.port_index.get(location.locode, -1)
+
+    def leg_distances(
+        self,
+        modes: Sequence[str],
+        origins: Sequence[str],
+        destinations: Sequence[str]
+    ) -> np.ndarray:
+        """Km for each (mode, origin, destination) leg; NaN where an endpoint is unknown"""
+        n = len(modes)
+        # Resolve each distinct endpoint once, then gather per leg by index
+        names: Dict[str, int] = {}
+        start = np.fromiter((names.setdefault(name, len(names)) for name in origins), dtype=np.int64, count=n)
+        end = np.fromiter((names.setdefault(name, len(names)) for name in destinations), dtype=np.int64, count=n)
+
+        places = [self.place(name) for name in names]
+        cities: Dict[str, int] = {}
+        lat = np.array([p[0] if p else np.nan for p in places])
+        lon = np.array([p[1] if p else np.nan for p in places])
+        port = np.array([p[3] if p else -1 for p in places], dtype=np.int64)
+        city = np.array([cities.setdefault(p[2], len(cities)) if p else -1 for p in places], dtype=np.int64)
+
+        codes = np.fromiter((mode_code(mode) for mode in modes), dtype=np.int64, count=n)
+        km = great_circle_km_array(lat[start], lon[start], lat[end], lon[end]) * self.detour[codes]
+
+        sea = (codes == OCEAN) & (port[start] >= 0) & (port[end] >= 0)
+        if sea.any():
+            lanes = self.sea_km[port[start][sea], port[end][sea]]
+            km[sea] = np.where(np.isfinite(lanes), lanes, km[sea])
+        km[(city[start] >= 0) & (city[start] == city[end])] = LOCAL_DRAYAGE_KM
+        return np.round(km, 1)
+
+    def fill_routes(self, options: List[Option]):
+        """
+        Set ``distance_km`` on every leg that lacks it, in one batched call
+
+        Legs are updated in place, so this runs on freshly fetched options
+        before they are cached or shared.
+        """
+        legs = [leg for option in options for leg in option.route if leg.distance_km is None]
+        if not legs:
+            return
+        km = self.leg_distances(
+            [leg.mode for leg in legs],
+            [leg.origin for leg in legs],
+            [leg.destination for leg in legs],
+        )
+        for leg, value in zip(legs, km.tolist()):
+            if value == value:  # skip NaN
+                leg.distance_km = value
+
+@lru_cache(maxsize=1)
+def get_distance_service() -> DistanceService:
+    """Process-wide distance service, built once on first use"""
+    return DistanceService.load()
@@ -0,0 +1,141 @@
+"""
+Emissions engine
+Per-leg and per-option CO2e for whole option sets in one array pass, from
+a tonne-km factor table keyed by mode and vehicle class
+"""
+import csv
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Tuple
+
+import numpy as np
+
+from app.models.schemas import ShipmentDetailsRequest
+from app.services.options import Option
+from app.services.distances import mode_code
+from app.services.routing import TRUCK, RAIL, OCEAN, AIR
+
+logger = logging.getLogger(__name__)
+
+EMISSION_FACTORS_PATH = Path(__file__).resolve().parent.parent / "data" / "emission_factors.csv"
+
+# Air legs shorter than this use the short-haul factor
+SHORT_HAUL_KM = 1500.0
+
+def shipment_tons(details: ShipmentDetailsRequest) -> float:
+    return details.weight if details.weightUnit == "tons" else details.weight / 1000
+
+class EmissionsEngine:
+    """
+    Vectorized CO2e accounting
+
+    Every leg of every option is flattened into arrays of mode, vehicle
+    class and distance; emissions are weight x distance x factor in one
+    pass and summed per option with ``np.bincount``. Truck legs are the main
+    haul (FTL or LTL) on trucking options and drayage on the others.
+    """
+
+    def __init__(self, factors: Dict[Tuple[str, str], float]):
+        self.classes = list(factors)
+        self.factors = np.array([factors[key] for key in self.classes], dtype=np.float64)
+        index = {key: i for i, key in enumerate(self.classes)}
+        self._ftl = index[("truck", "ftl")]
+        self._ltl = index[("truck", "ltl")]
+        self._drayage = index[("truck", "drayage")]
+        self._rail = index[("rail", "freight")]
+        self._ocean = index[("ocean", "container")]
+        self._air_short = index[("air", "short_haul")]
+        self._air_long = index[("air", "long_haul")]
+
+    @classmethod
+    def load(cls, path: Path = EMISSION_FACTORS_PATH) -> "EmissionsEngine":
+        """Build the engine from the bundled factor table (kg CO2e per tonne-km)"""
+        factors: Dict[Tuple[str, str], float] = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                factors[(row["mode"], row["vehicle_class"])] = float(row["kg_co2e_per_tonne_km"])
+        logger.info(f"Emission factors loaded: {len(factors)} vehicle classes")
+        return cls(factors)
+
+    def vehicle_classes(
+        self,
+        leg_modes: np.ndarray,
+        option_modes: np.ndarray,
+        ltl: np.ndarray,
+        distance_km: np.ndarray
+    ) -> np.ndarray:
+        """Factor-table row for each leg"""
+        return np.select(
+            [
+                leg_modes == OCEAN,
+                leg_modes == RAIL,
+                (leg_modes == AIR) & (distance_km < SHORT_HAUL_KM),
+                leg_modes == AIR,
+                option_modes != TRUCK,
+                ltl,
+            ],
+            [self._ocean, self._rail, self._air_short, self._air_long, self._drayage, self._ltl],
+            default=self._ftl,
+        )
+
+    def leg_emissions(
+        self,
+        weight_tons: float,
+        leg_modes: np.ndarray,
+        option_modes: np.ndarray,
+        ltl: np.ndarray,
+        distance_km: np.ndarray
+    ) -> np.ndarray:
+        """kg CO2e per leg; NaN where the distance is unknown"""
+        classes = self.vehicle_classes(leg_modes, option_modes, ltl, distance_km)
+        return weight_tons * distance_km * self.factors[classes]
+
+    def annotate(self, details: ShipmentDetailsRequest, options: List[Option]) -> List[Option]:
+        """
+        Copies of the options with per-leg ``co2e_kg`` and a ``carbonFootprint`` total
+
+        Options with a leg of unknown distance keep whatever footprint the
+        provider quoted.
+        """
+        counts = np.fromiter((len(option.route) for option in options), dtype=np.int64, count=len(options))
+        total_legs = int(counts.sum())
+        if not total_legs:
+            return options
+
+        owner = np.repeat(np.arange(len(options)), counts)
+        leg_modes = np.fromiter(
+            (mode_code(leg.mode) for option in options for leg in option.route), dtype=np.int64, count=total_legs
+        )
+        distance_km = np.fromiter(
+            (np.nan if leg.distance_km is None else leg.distance_km for option in options for leg in option.route),
+            dtype=np.float64,
+            count=total_legs,
+        )
+        option_modes = np.fromiter((mode_code(option.mode) for option in options), dtype=np.int64, count=len(options))
+        ltl = np.fromiter(("ltl" in option.mode.lower() for option in options), dtype=bool, count=len(options))
+
+        co2e = self.leg_emissions(shipment_tons(details), leg_modes, option_modes[owner], ltl[owner], distance_km)
+        unknown = np.bincount(owner, weights=np.isnan(co2e), minlength=len(options)) > 0
+        totals = np.bincount(owner, weights=np.nan_to_num(co2e), minlength=len(options))
+
+        co2e = np.round(co2e, 1).tolist()
+        totals = np.round(totals, 1).tolist()
+        annotated = []
+        position = 0
+        for i, option in enumerate(options):
+            legs = len(option.route)
+            if legs and not unknown[i]:
+                route = [
+                    leg.replace(co2e_kg=value)
+                    for leg, value in zip(option.route, co2e[position:position + legs])
+                ]
+                option = option.replace(route=route, carbonFootprint=totals[i])
+            annotated.append(option)
+            position += legs
+        return annotated
+
+@lru_cache(maxsize=1)
+def get_emissions_engine() -> EmissionsEngine:
+    """Process-wide emissions engine, built once on first use"""
+    return EmissionsEngine.load()
@@ -4,84 +4,179 @@ Handles API calls to Freightos, ShipEngine, EasyPost, etc.
 """
 import asyncio
 import logging
-from typing import List
-from app.models.schemas import (
-    ShipmentDetailsRequest,
-    ShippingOptionResponse,
-    TransportLegResponse,
-)
+import httpx
+from typing import List, Optional, Any
+from app.models.schemas import ShipmentDetailsRequest
+from app.config import settings
+from app.services.options import Option
+from app.services.http_client import ProviderHTTPClients, provider_http
+from app.services.provider_health import ProviderHealthRegistry, ProviderUnavailable, provider_health
+from app.services.rate_limiter import RateLimitScheduler, rate_limiter
+from app.services.metrics import PROVIDER_ERRORS
 
 logger = logging.getLogger(__name__)
 
 class FreightProviders:
     """Manages calls to multiple freight APIs"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        http: Optional[ProviderHTTPClients] = None,
+        health: Optional[ProviderHealthRegistry] = None,
+        limiter: Optional[RateLimitScheduler] = None
+    ):
         # API keys from environment
-        self.freightos_key = None
-        self.shipengine_key = None
-        self.easypost_key = None
+        self.freightos_key = settings.freightos_api_key or None
+        self.shipengine_key = settings.shipengine_api_key or None
+        self.easypost_key = settings.easypost_api_key or None
+        
+        # Shared pooled transport, per-provider health and API key quotas
+        self.http = http or provider_http
+        self.health = health or provider_health
+        self.limiter = limiter or rate_limiter
+    
+    def configured(self, kind: str) -> bool:
+        """Whether a provider for ``kind`` ("ocean", "air" or "land") has an API key"""
+        if kind == "land":
+            return bool(self.shipengine_key or self.easypost_key)
+        return bool(self.freightos_key)
     
     async def get_ocean_freight_quotes(
         self,
         details: ShipmentDetailsRequest
-    ) -> List[ShippingOptionResponse]:
+    ) -> List[Option]:
         """Get quotes from ocean freight providers (Freightos, direct carriers)"""
         
         quotes = []
         
         try:
-            # Call Freightos API (example)
-            # quotes.extend(await self._call_freightos_api(details))
-            pass
+            if self.freightos_key:
+                quotes.extend(await self._call_freightos_api(details, "ocean"))
         except Exception as e:
             logger.error(f"Error fetching ocean quotes: {e}")
+            raise
         
         return quotes
     
     async def get_air_freight_quotes(
         self,
         details: ShipmentDetailsRequest
-    ) -> List[ShippingOptionResponse]:
+    ) -> List[Option]:
         """Get quotes from air freight providers"""
         
         quotes = []
         
         try:
-            # Call air freight APIs
-            pass
+            if self.freightos_key:
+                quotes.extend(await self._call_freightos_api(details, "air"))
         except Exception as e:
             logger.error(f"Error fetching air quotes: {e}")
+            raise
         
         return quotes
     
     async def get_land_freight_quotes(
         self,
         details: ShipmentDetailsRequest
-    ) -> List[ShippingOptionResponse]:
+    ) -> List[Option]:
         """Get quotes from trucking providers (FTL/LTL)"""
         
         quotes = []
         
-        try:
-            # Call ShipEngine, EasyPost for trucking quotes
-            pass
-        except Exception as e:
-            logger.error(f"Error fetching land quotes: {e}")
+        # Query ShipEngine and EasyPost concurrently; one failing keeps the other's quotes
+        calls = []
+        if self.shipengine_key:
+            calls.append(self._call_shipengine_api(details))
+        if self.easypost_key:
+            calls.append(self._call_easypost_api(details))
+        
+        errors = []
+        for result in await asyncio.gather(*calls, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error(f"Error fetching land quotes: {result}")
+                errors.append(result)
+            else:
+                quotes.extend(result)
+        if errors and len(errors) == len(calls):
+            raise errors[0]
         
         return quotes
     
-    async def _call_freightos_api(self, details: ShipmentDetailsRequest):
+    async def _call_freightos_api(
+        self,
+        details: ShipmentDetailsRequest,
+        mode: str
+    ) -> List[Option]:
         """Call Freightos API for rates"""
-        # Implementation would go here
-        pass
+        response = await self._send(
+            "freightos",
+            settings.freightos_base_url,
+            "POST",
+            "/api/v1/freightEstimates",
+            headers={"x-apikey": self.freightos_key},
+            json={"mode": mode, "shipment": details.model_dump(mode="json")},
+        )
+        return self._parse_options(response.json())
     
-    async def _call_shipengine_api(self, details: ShipmentDetailsRequest):
+    async def _call_shipengine_api(
+        self,
+        details: ShipmentDetailsRequest
+    ) -> List[Option]:
         """Call ShipEngine API for LTL rates"""
-        # Implementation would go here
-        pass
+        response = await self._send(
+            "shipengine",
+            settings.shipengine_base_url,
+            "POST",
+            "/v-beta/ltl/quotes",
+            headers={"API-Key": self.shipengine_key},
+            json={"shipment": details.model_dump(mode="json")},
+        )
+        return self._parse_options(response.json())
     
-    async def _call_easypost_api(self, details: ShipmentDetailsRequest):
+    async def _call_easypost_api(
+        self,
+        details: ShipmentDetailsRequest
+    ) -> List[Option]:
         """Call EasyPost API for carrier quotes"""
-        # Implementation would go here
-        pass
+        response = await self._send(
+            "easypost",
+            settings.easypost_base_url,
+            "POST",
+            "/v2/shipments",
+            auth=(self.easypost_key, ""),
+            json={"shipment": details.model_dump(mode="json")},
+        )
+        return self._parse_options(response.json())
+    
+    async def _send(self, provider: str, base_url: str, method: str, path: str, **kwargs):
+        """
+        Send a provider request through its circuit breaker and rate limiter
+        Hedges only go out when the key's bucket has a spare token.
+        """
+        try:
+            return await self.health.get(provider).call(
+                lambda: self.http.request(provider, base_url, method, path, **kwargs),
+                admit=lambda: self.limiter.acquire(provider),
+                hedge_permit=lambda: self.limiter.try_acquire(provider),
+            )
+        except Exception as e:
+            PROVIDER_ERRORS.labels(provider, self._error_kind(e)).inc()
+            raise
+    
+    @staticmethod
+    def _error_kind(error: Exception) -> str:
+        if isinstance(error, ProviderUnavailable):
+            return "circuit_open"
+        if isinstance(error, asyncio.TimeoutError):
+            return "timeout"
+        if isinstance(error, httpx.HTTPStatusError):
+            return f"http_{error.response.status_code // 100}xx"
+        if isinstance(error, httpx.TransportError):
+            return "transport"
+        return "other"
+    
+    def _parse_options(self, payload: Any) -> List[Option]:
+        """Map a provider payload (a list of options, or {"options": [...]}) to option records"""
+        if isinstance(payload, dict):
+            payload = payload.get("options", [])
+        return [Option.from_dict(item) for item in payload]
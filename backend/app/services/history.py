@@ -0,0 +1,117 @@
+"""
+Quote history queries
+Lane/date filtered reads over persisted quotes with keyset pagination
+"""
+import json
+import base64
+from datetime import datetime, timezone
+from typing import Optional, List, Tuple, Any
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database import Quote
+from app.models.schemas import QuoteHistoryItem
+from app.services.locations import location_code
+
+SORT_COLUMNS = {
+    "created_at": Quote.created_at,
+    "price": Quote.price,
+}
+
+def naive_utc(value: datetime) -> datetime:
+    """``created_at`` is stored as naive UTC; aware bounds are converted to match"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def encode_cursor(sort: str, order: str, value: Any, row_id: int) -> str:
+    """Opaque cursor holding the sort key of the last row on a page"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, order, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, order: str) -> Tuple[Any, int]:
+    """Sort value and id from a cursor; raises ValueError if it is malformed or for another ordering"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_order, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise ValueError("Cursor does not match the requested sort order")
+    if sort == "created_at":
+        value = naive_utc(datetime.fromisoformat(value))
+    return value, int(row_id)
+
+def _to_item(quote: Quote) -> QuoteHistoryItem:
+    return QuoteHistoryItem(
+        id=quote.id,
+        requestId=quote.request_id,
+        optionIndex=quote.option_index,
+        origin=quote.origin,
+        destination=quote.destination,
+        mode=quote.mode,
+        price=quote.price,
+        transitDays=quote.transit_days,
+        route=quote.route or [],
+        carbonFootprint=quote.carbon_footprint,
+        reliability=quote.reliability,
+        createdAt=quote.created_at,
+    )
+
+async def query_quote_history(
+    db: AsyncSession,
+    origin: Optional[str] = None,
+    destination: Optional[str] = None,
+    mode: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Tuple[List[QuoteHistoryItem], Optional[str]]:
+    """
+    One page of persisted quotes and the cursor for the next page
+
+    Locations are matched on their resolved code, so "Shanghai, China" and
+    "CNSHA" find the same rows. Pages continue from the (sort value, id) of
+    the previous page's last row instead of an OFFSET, so every page is an
+    index range scan on the lane composites no matter how deep it is.
+    """
+    column = SORT_COLUMNS[sort]
+    descending = order == "desc"
+
+    query = select(Quote)
+    if origin:
+        query = query.where(Quote.origin_code == location_code(origin))
+    if destination:
+        query = query.where(Quote.destination_code == location_code(destination))
+    if mode:
+        query = query.where(Quote.mode == mode)
+    if created_from is not None:
+        query = query.where(Quote.created_at >= naive_utc(created_from))
+    if created_to is not None:
+        query = query.where(Quote.created_at < naive_utc(created_to))
+
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort, order)
+        key = tuple_(column, Quote.id)
+        query = query.where(key < (value, row_id) if descending else key > (value, row_id))
+
+    if descending:
+        query = query.order_by(column.desc(), Quote.id.desc())
+    else:
+        query = query.order_by(column.asc(), Quote.id.asc())
+
+    # One extra row tells us whether another page exists
+    rows = (await db.execute(query.limit(limit + 1))).scalars().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, order, getattr(last, column.key), last.id)
+
+    return [_to_item(row) for row in rows], next_cursor
@@ -0,0 +1,93 @@
+"""
+Shared async HTTP transport for freight provider APIs
+Keeps one pooled keep-alive client per provider host
+"""
+import asyncio
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+from app.config import settings
+from app.services.metrics import PROVIDER_REQUEST_SECONDS, PROVIDER_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+class ProviderHTTPClients:
+    """
+    Pooled HTTP clients shared by every FreightProviders instance.
+
+    Each provider gets its own httpx.AsyncClient (and so its own connection
+    pool to that host) plus a semaphore bounding in-flight requests. Clients
+    are created lazily on first use and closed by ``aclose`` at app shutdown.
+    ``transport`` replaces the network layer, e.g. with stub providers for
+    load tests.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_connections = max_connections or settings.http_max_connections
+        self.max_keepalive = max_keepalive or settings.http_max_keepalive
+        self.keepalive_expiry = keepalive_expiry or settings.http_keepalive_expiry
+        self.max_concurrency = max_concurrency or settings.provider_max_concurrency
+        self.timeout = timeout or settings.provider_timeout
+        self.transport = transport
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def client(self, provider: str, base_url: str) -> httpx.AsyncClient:
+        """Get (or create) the pooled client for a provider"""
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=self.timeout,
+                transport=self.transport,
+            )
+            self._clients[provider] = client
+        return client
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(provider)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[provider] = semaphore
+        return semaphore
+
+    async def request(
+        self,
+        provider: str,
+        base_url: str,
+        method: str,
+        path: str,
+        **kwargs
+    ) -> httpx.Response:
+        """Send a request through the provider's pool, bounded by its concurrency limit"""
+        async with self._semaphore(provider):
+            with PROVIDER_IN_FLIGHT.labels(provider).track_inprogress(), \
+                    PROVIDER_REQUEST_SECONDS.labels(provider).time():
+                response = await self.client(provider, base_url).request(method, path, **kwargs)
+        response.raise_for_status()
+        return response
+
+    async def aclose(self):
+        """Close every pooled client"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+# Process-wide pool, closed on app shutdown
+provider_http = ProviderHTTPClients()
@@ -0,0 +1,277 @@
+"""
+Location resolution
+Maps free-text origins/destinations to UN/LOCODE + IATA entries from the
+bundled app/data/locations.csv, a curated subset of major ports, airports
+and inland hubs rather than the full UN/LOCODE list
+"""
+import csv
+import bisect
+import logging
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, List, Dict, Set, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+LOCATIONS_PATH = Path(__file__).resolve().parent.parent / "data" / "locations.csv"
+
+# Common country spellings that are neither the dataset name nor the ISO code
+COUNTRY_ALIASES = {
+    "usa": "US",
+    "america": "US",
+    "united states of america": "US",
+    "uk": "GB",
+    "great britain": "GB",
+    "britain": "GB",
+    "england": "GB",
+    "uae": "AE",
+    "emirates": "AE",
+    "holland": "NL",
+    "the netherlands": "NL",
+    "korea": "KR",
+    "republic of korea": "KR",
+    "prc": "CN",
+}
+
+# States and provinces accepted as a ", Region" suffix, by country
+REGIONS = {
+    "US": {
+        "al": "alabama", "ak": "alaska", "az": "arizona", "ar": "arkansas", "ca": "california",
+        "co": "colorado", "ct": "connecticut", "de": "delaware", "dc": "district of columbia",
+        "fl": "florida", "ga": "georgia", "hi": "hawaii", "id": "idaho", "il": "illinois",
+        "in": "indiana", "ia": "iowa", "ks": "kansas", "ky": "kentucky", "la": "louisiana",
+        "me": "maine", "md": "maryland", "ma": "massachusetts", "mi": "michigan", "mn": "minnesota",
+        "ms": "mississippi", "mo": "missouri", "mt": "montana", "ne": "nebraska", "nv": "nevada",
+        "nh": "new hampshire", "nj": "new jersey", "nm": "new mexico", "ny": "new york",
+        "nc": "north carolina", "nd": "north dakota", "oh": "ohio", "ok": "oklahoma", "or": "oregon",
+        "pa": "pennsylvania", "ri": "rhode island", "sc": "south carolina", "sd": "south dakota",
+        "tn": "tennessee", "tx": "texas", "ut": "utah", "vt": "vermont", "va": "virginia",
+        "wa": "washington", "wv": "west virginia", "wi": "wisconsin", "wy": "wyoming",
+    },
+    "CA": {
+        "ab": "alberta", "bc": "british columbia", "mb": "manitoba", "nb": "new brunswick",
+        "nl": "newfoundland and labrador", "ns": "nova scotia", "nt": "northwest territories",
+        "nu": "nunavut", "on": "ontario", "pe": "prince edward island", "qc": "quebec",
+        "sk": "saskatchewan", "yt": "yukon",
+    },
+    "AU": {
+        "act": "australian capital territory", "nsw": "new south wales", "nt": "northern territory",
+        "qld": "queensland", "sa": "south australia", "tas": "tasmania", "vic": "victoria",
+        "wa": "western australia",
+    },
+}
+
+# Trigram similarity a misspelling needs before its edit distance is checked
+MIN_FUZZY_SCORE = 0.6
+
+def max_typos(name: str) -> int:
+    """Edits a misspelled name may be away from a known one: one, or two for long names"""
+    return 1 if len(name) <= 8 else 2
+
+class Location(NamedTuple):
+    locode: str
+    name: str
+    country: str
+    iata: str
+    lat: float
+    lon: float
+
+    @property
+    def country_code(self) -> str:
+        return self.locode[:2]
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = "".join(c if c.isalnum() else " " for c in text.lower().replace("'", ""))
+    return " ".join(text.split())
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or ``limit + 1`` as soon as it must exceed ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class LocationResolver:
+    """
+    In-memory index over the bundled location dataset
+
+    Lookups try, in order: exact UN/LOCODE or IATA code, exact name or alias,
+    shortest name prefix, then misspellings a typo or two away. A trailing
+    ", Country" or ", State" part must agree with the match at every step;
+    input that matches nothing is left unresolved rather than guessed.
+    Results are memoized per input string.
+    """
+
+    def __init__(self, locations: List[Location], aliases: Dict[str, List[int]], cache_size: int = 4096):
+        self.locations = locations
+        self._codes: Dict[str, int] = {}
+        self._names: Dict[str, List[int]] = defaultdict(list)
+        self._trigrams: Dict[str, Set[str]] = defaultdict(set)
+
+        for i, location in enumerate(locations):
+            self._codes.setdefault(location.locode, i)
+            if location.iata:
+                self._codes.setdefault(location.iata, i)
+            self._names[normalize(location.name)].append(i)
+        for alias, indexes in aliases.items():
+            for i in indexes:
+                if i not in self._names[alias]:
+                    self._names[alias].append(i)
+
+        self._sorted_names = sorted(self._names)
+        self._gram_counts: Dict[str, int] = {}
+        for name in self._sorted_names:
+            grams = _trigrams(name)
+            self._gram_counts[name] = len(grams)
+            for gram in grams:
+                self._trigrams[gram].add(name)
+
+        # Suffix -> countries it can denote ("ca" is Canada or California)
+        self._regions: Dict[str, Set[str]] = defaultdict(set)
+        for alias, country_code in COUNTRY_ALIASES.items():
+            self._regions[alias].add(country_code)
+        for location in locations:
+            self._regions[normalize(location.country)].add(location.country_code)
+            self._regions[location.country_code.lower()].add(location.country_code)
+        for country_code, regions in REGIONS.items():
+            for abbreviation, region in regions.items():
+                self._regions[abbreviation].add(country_code)
+                self._regions[region].add(country_code)
+
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    @classmethod
+    def load(cls, path: Path = LOCATIONS_PATH) -> "LocationResolver":
+        """Build the resolver from the bundled CSV"""
+        locations: List[Location] = []
+        aliases: Dict[str, List[int]] = defaultdict(list)
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                locations.append(Location(
+                    locode=row["locode"].upper(),
+                    name=row["name"],
+                    country=row["country"],
+                    iata=row["iata"].upper(),
+                    lat=float(row["lat"]),
+                    lon=float(row["lon"]),
+                ))
+                for alias in filter(None, row["aliases"].split("|")):
+                    aliases[normalize(alias)].append(len(locations) - 1)
+
+        logger.info(f"Location index loaded: {len(locations)} locations")
+        return cls(locations, aliases)
+
+    def _resolve(self, text: str) -> Optional[Location]:
+        raw = text.strip()
+        if not raw:
+            return None
+
+        code = self._codes.get(raw.upper().replace(" ", ""))
+        if code is not None and len(raw) <= 6:
+            return self.locations[code]
+
+        city, _, region = raw.partition(",")
+        # "Shanghai, China", "Los Angeles, CA" and "Shanghai CN" style inputs
+        name = normalize(city)
+        region = normalize(region.split(",")[-1]) if region else ""
+        countries = self._regions.get(region) if region else None
+        if region and countries is None:
+            # A suffix we cannot check may name another country's town of the same name
+            return None
+        if countries is None and " " in name:
+            head, _, tail = name.rpartition(" ")
+            if tail in self._regions and head in self._names:
+                name, countries = head, self._regions[tail]
+
+        for candidates in (self._exact(name), self._prefix(name, countries), self._fuzzy(name)):
+            match = self._pick(candidates, countries)
+            if match is not None:
+                return match
+        return None
+
+    def _exact(self, name: str) -> List[int]:
+        return self._names.get(name, [])
+
+    def _prefix(self, name: str, countries: Optional[Set[str]]) -> List[int]:
+        if len(name) < 3:
+            return []
+        names = self._sorted_names
+        matches = []
+        i = bisect.bisect_left(names, name)
+        while i < len(names) and names[i].startswith(name):
+            matches.extend(
+                j for j in self._names[names[i]]
+                if countries is None or self.locations[j].country_code in countries
+            )
+            i += 1
+        # Only an unambiguous completion: "ham" -> Hamburg, but "port" could be Port Klang or Port Said
+        if len({self.locations[j].locode for j in matches}) > 1:
+            return []
+        return matches
+
+    def _fuzzy(self, name: str) -> List[int]:
+        grams = _trigrams(name)
+        overlap: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self._trigrams.get(gram, ()):
+                overlap[candidate] += 1
+
+        limit = max_typos(name)
+        scored = []
+        for candidate, shared in overlap.items():
+            score = 2 * shared / (len(grams) + self._gram_counts[candidate])
+            if score < MIN_FUZZY_SCORE:
+                continue
+            # Similar-looking names ("Atlantis", "Atlanta") must also be a typo or two apart
+            edits = edit_distance(name, candidate, limit)
+            if edits <= limit:
+                scored.append((edits, -score, candidate))
+        scored.sort()
+        return [i for _, _, candidate in scored for i in self._names[candidate]]
+
+    def _pick(self, candidates: List[int], countries: Optional[Set[str]]) -> Optional[Location]:
+        for i in candidates:
+            location = self.locations[i]
+            if countries is None or location.country_code in countries:
+                return location
+        return None
+
+@lru_cache(maxsize=1)
+def get_location_resolver() -> LocationResolver:
+    """Process-wide location resolver, built once on first use"""
+    return LocationResolver.load()
+
+def resolve_location(text: str) -> Optional[Location]:
+    """Resolve free text to a known location, or None"""
+    return get_location_resolver().resolve(text)
+
+def location_code(text: str) -> str:
+    """UN/LOCODE for known locations, normalized text otherwise"""
+    resolved = resolve_location(text)
+    if resolved is not None:
+        return resolved.locode
+    return normalize(text)
+
+def get_port_code(location: str) -> str:
+    """Location part of the UN/LOCODE, or the first letters of unresolved input"""
+    # "Shanghai, China" -> "SHA"
+    resolved = resolve_location(location)
+    if resolved is not None:
+        return resolved.locode[2:]
+    return location.split(",")[0].strip().upper()[:3]
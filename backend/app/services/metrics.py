@@ -0,0 +1,135 @@
+"""
+Prometheus metrics and timing spans for the quote pipeline
+"""
+import time
+import logging
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, List, Iterator, Callable, TypeVar
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable)
+
+# Latency buckets (seconds) spanning in-memory stages to slow provider calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15)
+
+STAGE_SECONDS = Histogram(
+    "freight_stage_duration_seconds",
+    "Duration of quote pipeline stages",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "freight_http_request_duration_seconds",
+    "API request latency",
+    ["method", "endpoint", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "freight_http_requests_in_flight",
+    "API requests currently being served",
+    ["endpoint"],
+)
+PROVIDER_REQUEST_SECONDS = Histogram(
+    "freight_provider_request_duration_seconds",
+    "Latency of individual provider HTTP attempts (hedges included)",
+    ["provider"],
+    buckets=LATENCY_BUCKETS,
+)
+PROVIDER_IN_FLIGHT = Gauge(
+    "freight_provider_requests_in_flight",
+    "Provider HTTP attempts currently in flight",
+    ["provider"],
+)
+PROVIDER_ERRORS = Counter(
+    "freight_provider_errors_total",
+    "Failed provider requests by kind",
+    ["provider", "kind"],
+)
+PROVIDER_QUEUE_SECONDS = Histogram(
+    "freight_provider_rate_limit_wait_seconds",
+    "Time spent waiting for a provider rate limit token",
+    ["provider"],
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "freight_quote_cache_lookups_total",
+    "Quote cache lookups",
+    ["result"],
+)
+CACHE_HIT_RATIO = Gauge(
+    "freight_quote_cache_hit_ratio",
+    "Share of quote cache lookups served from cache since start",
+)
+
+_cache_hits = 0
+_cache_lookups = 0
+CACHE_HIT_RATIO.set_function(lambda: _cache_hits / _cache_lookups if _cache_lookups else 0.0)
+
+def record_cache_lookup(hit: bool):
+    global _cache_hits, _cache_lookups
+    _cache_lookups += 1
+    if hit:
+        _cache_hits += 1
+    CACHE_LOOKUPS.labels("hit" if hit else "miss").inc()
+
+class Span:
+    """One timed unit of work; children are spans opened while it was current"""
+
+    __slots__ = ("name", "parent", "children", "started", "duration")
+
+    def __init__(self, name: str, parent: Optional["Span"]):
+        self.name = name
+        self.parent = parent
+        self.children: List["Span"] = []
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        if parent is not None:
+            parent.children.append(self)
+
+    def breakdown(self, depth: int = 0) -> List[str]:
+        """Indented "name: ms" lines for this span and its children"""
+        ms = f"{self.duration * 1000:.1f}ms" if self.duration is not None else "running"
+        lines = [f"{'  ' * depth}{self.name}: {ms}"]
+        for child in self.children:
+            lines.extend(child.breakdown(depth + 1))
+        return lines
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+@contextmanager
+def span(name: str, record: bool = True) -> Iterator[Span]:
+    """
+    Time a block as a child of the current span
+
+    The span is current for everything awaited inside the block, including
+    tasks created there, since they copy the context. Its duration is
+    observed in ``freight_stage_duration_seconds{stage=name}`` unless
+    ``record`` is False (e.g. for per-request root spans).
+    """
+    current = Span(name, _current_span.get())
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - current.started
+        _current_span.reset(token)
+        if record:
+            STAGE_SECONDS.labels(name).observe(current.duration)
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorator running a coroutine function inside ``span(name)``"""
+    def decorate(fn: F) -> F:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorate
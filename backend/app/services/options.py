@@ -0,0 +1,188 @@
+"""
+Compact internal records for shipping options
+Options travel the pipeline as __slots__ records and are only encoded to
+JSON (with orjson) at the response boundary
+"""
+from typing import Optional, List, Dict, Any, Union
+
+import orjson
+
+from app.models.schemas import ShippingOptionResponse, LaneBenchmarkResponse
+
+class Leg:
+    """One transport leg; mirrors TransportLegResponse"""
+
+    __slots__ = ("mode", "origin", "destination", "duration", "carrier", "distance_km", "co2e_kg")
+
+    def __init__(
+        self,
+        mode: str,
+        origin: str,
+        destination: str,
+        duration: str,
+        carrier: Optional[str] = None,
+        distance_km: Optional[float] = None,
+        co2e_kg: Optional[float] = None,
+    ):
+        self.mode = mode
+        self.origin = origin
+        self.destination = destination
+        self.duration = duration
+        self.carrier = carrier
+        self.distance_km = distance_km
+        self.co2e_kg = co2e_kg
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Leg":
+        distance = data.get("distance_km")
+        co2e = data.get("co2e_kg")
+        return cls(
+            mode=str(data["mode"]),
+            origin=str(data["origin"]),
+            destination=str(data["destination"]),
+            duration=str(data["duration"]),
+            carrier=data.get("carrier"),
+            distance_km=float(distance) if distance is not None else None,
+            co2e_kg=float(co2e) if co2e is not None else None,
+        )
+
+    def replace(self, **changes: Any) -> "Leg":
+        """Shallow copy with some fields changed"""
+        leg = Leg(self.mode, self.origin, self.destination, self.duration,
+                  self.carrier, self.distance_km, self.co2e_kg)
+        for name, value in changes.items():
+            setattr(leg, name, value)
+        return leg
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "origin": self.origin,
+            "destination": self.destination,
+            "duration": self.duration,
+            "carrier": self.carrier,
+            "distance_km": self.distance_km,
+            "co2e_kg": self.co2e_kg,
+        }
+
+class Option:
+    """
+    One shipping option; mirrors ShippingOptionResponse field names so
+    selection and scoring accept either
+    """
+
+    __slots__ = ("mode", "price", "transitDays", "route", "carbonFootprint", "reliability", "marketPercentile")
+
+    def __init__(
+        self,
+        mode: str,
+        price: float,
+        transitDays: int,
+        route: List[Leg],
+        carbonFootprint: Optional[float] = None,
+        reliability: Optional[float] = None,
+        marketPercentile: Optional[float] = None,
+    ):
+        self.mode = mode
+        self.price = price
+        self.transitDays = transitDays
+        self.route = route
+        self.carbonFootprint = carbonFootprint
+        self.reliability = reliability
+        self.marketPercentile = marketPercentile
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Option":
+        """Build from a provider or cache payload; raises KeyError/ValueError on malformed input"""
+        carbon = data.get("carbonFootprint")
+        reliability = data.get("reliability")
+        percentile = data.get("marketPercentile")
+        return cls(
+            mode=str(data["mode"]),
+            price=float(data["price"]),
+            transitDays=int(data["transitDays"]),
+            route=[Leg.from_dict(leg) for leg in data.get("route") or []],
+            carbonFootprint=float(carbon) if carbon is not None else None,
+            reliability=float(reliability) if reliability is not None else None,
+            marketPercentile=float(percentile) if percentile is not None else None,
+        )
+
+    def replace(self, **changes: Any) -> "Option":
+        """Shallow copy with some fields changed (cached records are shared, never mutated)"""
+        option = Option(self.mode, self.price, self.transitDays, self.route,
+                        self.carbonFootprint, self.reliability, self.marketPercentile)
+        for name, value in changes.items():
+            setattr(option, name, value)
+        return option
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "price": self.price,
+            "transitDays": self.transitDays,
+            "route": [leg.to_dict() for leg in self.route],
+            "carbonFootprint": self.carbonFootprint,
+            "reliability": self.reliability,
+            "marketPercentile": self.marketPercentile,
+        }
+
+    def to_json(self) -> bytes:
+        return orjson.dumps(self.to_dict())
+
+# Selection and scoring read the same attributes from records and request models
+OptionLike = Union[Option, ShippingOptionResponse]
+
+class QuoteResult:
+    """Output of optimize_routes; mirrors QuoteResponse"""
+
+    __slots__ = ("cheapest", "fastest", "bestValue", "options", "paretoFrontier",
+                 "marketBenchmarks", "aiSummary", "requestId", "aiSummaryStatus")
+
+    def __init__(
+        self,
+        cheapest: Option,
+        fastest: Option,
+        bestValue: Option,
+        options: List[Option],
+        paretoFrontier: List[Option],
+        marketBenchmarks: List[LaneBenchmarkResponse],
+        aiSummary: str,
+        requestId: str,
+        aiSummaryStatus: str = "template",
+    ):
+        self.cheapest = cheapest
+        self.fastest = fastest
+        self.bestValue = bestValue
+        self.options = options
+        self.paretoFrontier = paretoFrontier
+        self.marketBenchmarks = marketBenchmarks
+        self.aiSummary = aiSummary
+        self.requestId = requestId
+        self.aiSummaryStatus = aiSummaryStatus
+
+    def to_dict(self, include_options: bool = True) -> Dict[str, Any]:
+        """JSON-ready dict in the QuoteResponse shape; each option is encoded once"""
+        encoded: Dict[int, Dict[str, Any]] = {}
+
+        def encode(option: Option) -> Dict[str, Any]:
+            data = encoded.get(id(option))
+            if data is None:
+                data = encoded[id(option)] = option.to_dict()
+            return data
+
+        data = {
+            "cheapest": encode(self.cheapest),
+            "fastest": encode(self.fastest),
+            "bestValue": encode(self.bestValue),
+        }
+        if include_options:
+            data["options"] = [encode(option) for option in self.options]
+        data["paretoFrontier"] = [encode(option) for option in self.paretoFrontier]
+        data["marketBenchmarks"] = [benchmark.model_dump() for benchmark in self.marketBenchmarks]
+        data["aiSummary"] = self.aiSummary
+        data["requestId"] = self.requestId
+        data["aiSummaryStatus"] = self.aiSummaryStatus
+        return data
+
+    def to_json(self, include_options: bool = True) -> bytes:
+        return orjson.dumps(self.to_dict(include_options))
@@ -0,0 +1,152 @@
+"""
+Write-behind persistence of generated quotes
+Requests enqueue quote rows; a background worker flushes them in batches
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+from sqlalchemy import insert
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.database import Quote
+from app.models.schemas import ShipmentDetailsRequest
+from app.services.options import QuoteResult
+from app.services.locations import location_code
+from app.services.cache import weight_band
+from app.services.benchmarks import record_quote_rows
+
+logger = logging.getLogger(__name__)
+
+def quote_rows(details: ShipmentDetailsRequest, quote: QuoteResult) -> List[Dict[str, Any]]:
+    """One ``quotes`` row per option of a quote response"""
+    created_at = datetime.utcnow()
+    origin_code = location_code(details.origin)
+    destination_code = location_code(details.destination)
+    band = weight_band(details)
+    return [
+        {
+            "request_id": quote.requestId,
+            "option_index": i,
+            "origin": details.origin,
+            "destination": details.destination,
+            "origin_code": origin_code,
+            "destination_code": destination_code,
+            "shipment_types": details.shipmentTypes,
+            "weight": details.weight,
+            "weight_band": band,
+            "volume": details.volume,
+            "commodity": details.commodity,
+            "price": option.price,
+            "transit_days": option.transitDays,
+            "mode": option.mode,
+            "route": [leg.to_dict() for leg in option.route],
+            "carbon_footprint": option.carbonFootprint,
+            "reliability": option.reliability,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+        for i, option in enumerate(quote.options)
+    ]
+
+class QuoteWriter:
+    """
+    Bounded write-behind queue for quote rows.
+
+    ``enqueue`` waits at most ``quote_enqueue_timeout`` for queue space and
+    drops the quote (counted in ``dropped``) rather than stall the request.
+    The worker batches up to ``quote_flush_batch`` rows or whatever arrived
+    within ``quote_flush_interval`` into one multi-row INSERT, then folds the
+    same batch into the lane rate aggregates in a second transaction.
+    ``stop`` flushes everything still queued.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        """Start the background flush worker"""
+        if self._worker is None and settings.persist_quotes:
+            self.queue = asyncio.Queue(maxsize=settings.quote_queue_size)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush queued rows and stop the worker"""
+        if self._worker is None:
+            return
+        await self.queue.put(None)
+        await self._worker
+        self._worker = None
+
+    async def enqueue(self, details: ShipmentDetailsRequest, quote: QuoteResult):
+        """Queue a quote response for persistence without waiting on the database"""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(
+                self.queue.put(quote_rows(details, quote)),
+                timeout=settings.quote_enqueue_timeout
+            )
+        except asyncio.TimeoutError:
+            self.dropped += 1
+            logger.warning(f"Quote persistence queue full, dropped {quote.requestId}")
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch = await self.queue.get()
+            if batch is None:
+                break
+            rows = list(batch)
+
+            # Gather more rows until the batch is full or the interval passes
+            deadline = asyncio.get_running_loop().time() + settings.quote_flush_interval
+            while len(rows) < settings.quote_flush_batch:
+                remaining = deadline - asyncio.get_running_loop().time()
+                try:
+                    batch = await asyncio.wait_for(self.queue.get(), timeout=max(remaining, 0))
+                except asyncio.TimeoutError:
+                    break
+                if batch is None:
+                    stopping = True
+                    break
+                rows.extend(batch)
+
+            await self._flush(rows)
+
+        # Drain anything enqueued after the stop sentinel
+        rows = []
+        while not self.queue.empty():
+            batch = self.queue.get_nowait()
+            if batch is not None:
+                rows.extend(batch)
+        await self._flush(rows)
+
+    async def _flush(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        try:
+            async with self.session_factory() as session:
+                await session.execute(insert(Quote), rows)
+                await session.commit()
+            self.written += len(rows)
+        except Exception as e:
+            logger.error(f"Failed to persist {len(rows)} quote rows: {e}")
+            return
+
+        # Aggregates commit separately, so a failure there never loses quotes
+        try:
+            async with self.session_factory() as session:
+                await record_quote_rows(session, rows)
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to update lane benchmarks for {len(rows)} quote rows: {e}")
+
+# Process-wide writer, started and stopped with the app
+quote_writer = QuoteWriter()
@@ -0,0 +1,208 @@
+"""
+Per-provider health tracking
+Circuit breakers, EWMA latency-based adaptive timeouts and hedged requests
+"""
+import math
+import time
+import asyncio
+import logging
+from typing import Optional, Dict, Any, Callable, Awaitable, TypeVar
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class ProviderUnavailable(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+
+def _is_provider_fault(error: Exception) -> bool:
+    """Client errors (4xx other than 429) mean the provider is up; everything else counts against it"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return True
+
+class ProviderHealth:
+    """
+    Health of one provider.
+
+    The circuit opens after ``breaker_failure_threshold`` consecutive
+    failures and rejects calls for ``breaker_cooldown`` seconds, then lets a
+    single probe through (half-open); the probe's outcome closes or reopens
+    it. Successful latencies feed an EWMA of mean and variance, from which
+    the per-call timeout (mean + k·σ) and the hedge delay are derived once
+    ``health_min_samples`` calls have been seen.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.samples = 0
+        self.latency_mean = 0.0
+        self.latency_var = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.hedges = 0
+
+    def allow(self) -> bool:
+        """Whether a call may be sent now"""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < settings.breaker_cooldown:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == HALF_OPEN:
+            if self.probe_in_flight:
+                self.rejected += 1
+                return False
+            self.probe_in_flight = True
+        return True
+
+    def record_success(self, latency: float):
+        self.successes += 1
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            logger.info(f"Provider {self.name} recovered, closing circuit")
+        self.state = CLOSED
+        self.probe_in_flight = False
+
+        # Exponentially weighted mean and variance of latency
+        if self.samples == 0:
+            self.latency_mean = latency
+        else:
+            alpha = settings.health_ewma_alpha
+            delta = latency - self.latency_mean
+            self.latency_mean += alpha * delta
+            self.latency_var = (1 - alpha) * (self.latency_var + alpha * delta * delta)
+        self.samples += 1
+
+    def record_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= settings.breaker_failure_threshold:
+            if self.state != OPEN:
+                logger.warning(f"Provider {self.name} failing, opening circuit for {settings.breaker_cooldown}s")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    @property
+    def latency_std(self) -> float:
+        return math.sqrt(self.latency_var)
+
+    def timeout(self) -> float:
+        """Per-call timeout adapted to observed latency, capped at ``provider_timeout``"""
+        if self.samples < settings.health_min_samples:
+            return settings.provider_timeout
+        adaptive = self.latency_mean + settings.adaptive_timeout_k * self.latency_std
+        return min(max(adaptive, settings.adaptive_timeout_min), settings.provider_timeout)
+
+    def hedge_delay(self) -> float:
+        """How long to wait on the first attempt before sending a hedge; inf disables hedging"""
+        if not settings.hedge_requests or self.samples < settings.health_min_samples:
+            return math.inf
+        return self.latency_mean + settings.hedge_delay_k * self.latency_std
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "latencyMean": round(self.latency_mean, 4),
+            "latencyStd": round(self.latency_std, 4),
+            "timeout": round(self.timeout(), 4),
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "hedges": self.hedges,
+        }
+
+    async def call(
+        self,
+        send: Callable[[], Awaitable[T]],
+        admit: Optional[Callable[[], Awaitable[None]]] = None,
+        hedge_permit: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> T:
+        """
+        Run ``send`` under the circuit breaker, adaptive timeout and hedging
+
+        ``admit`` is awaited before the first attempt (e.g. a rate limiter)
+        and is not counted as provider latency. ``send`` is invoked again for
+        the hedge, so it must be safe to repeat; ``hedge_permit`` can veto the
+        hedge. The first attempt to succeed wins and the other is cancelled.
+        """
+        if not self.allow():
+            raise ProviderUnavailable(f"{self.name} circuit is open")
+
+        started = time.monotonic()
+        try:
+            if admit is not None:
+                await admit()
+                started = time.monotonic()
+            result = await asyncio.wait_for(self._hedged(send, hedge_permit), timeout=self.timeout())
+        except Exception as e:
+            if _is_provider_fault(e):
+                self.record_failure()
+            else:
+                self.record_success(time.monotonic() - started)
+            raise
+        except asyncio.CancelledError:
+            # Abandoned by the caller, not the provider's fault
+            self.probe_in_flight = False
+            raise
+        self.record_success(time.monotonic() - started)
+        return result
+
+    async def _hedged(
+        self,
+        send: Callable[[], Awaitable[T]],
+        hedge_permit: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> T:
+        attempts = {asyncio.ensure_future(send())}
+        hedge_delay = self.hedge_delay()
+        error = None
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=None if math.isinf(hedge_delay) else hedge_delay)
+            if not done and (hedge_permit is None or await hedge_permit()):
+                self.hedges += 1
+                attempts.add(asyncio.ensure_future(send()))
+            while attempts:
+                done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        return attempt.result()
+                    error = attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+class ProviderHealthRegistry:
+    """Health trackers for every provider, created on first use"""
+
+    def __init__(self):
+        self._providers: Dict[str, ProviderHealth] = {}
+
+    def get(self, provider: str) -> ProviderHealth:
+        health = self._providers.get(provider)
+        if health is None:
+            health = ProviderHealth(provider)
+            self._providers[provider] = health
+        return health
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: health.snapshot() for name, health in self._providers.items()}
+
+# Process-wide registry shared by every FreightProviders instance
+provider_health = ProviderHealthRegistry()
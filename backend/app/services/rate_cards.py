@@ -0,0 +1,332 @@
+"""
+Rate-card pricing engine
+Prices shipments from tariff tables stored as one memory-mapped .npy file
+per column, indexed by lane (origin x destination UN/LOCODE) and mode
+
+A rate card directory holds ``meta.json`` (location codes, carriers) and
+the columns below, sorted by (lane_key, break_units). Rows are never turned
+into Python objects: a quote is a handful of binary searches over the
+mapped columns.
+
+    python -m app.services.rate_cards tariffs.csv /srv/rate-card
+
+imports contracted tariffs from CSV; point RATE_CARD_DIR at the output.
+"""
+import os
+import sys
+import csv
+import json
+import math
+import shutil
+import hashlib
+import logging
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.models.schemas import ShipmentDetailsRequest, ShipmentTypeEnum
+from app.services.options import Leg, Option
+from app.services.locations import location_code
+from app.services.distances import get_distance_service
+from app.services.routing import NETWORK_PATH
+from app.utils.helpers import great_circle_km
+
+logger = logging.getLogger(__name__)
+
+MODES = tuple(t.value for t in ShipmentTypeEnum)
+OCEAN_FCL, OCEAN_LCL, AIR_CARGO, FTL, LTL = range(len(MODES))
+
+# Value columns and their dtypes; lane_key is (origin * n_codes + destination) * n_modes + mode
+COLUMNS = {
+    "lane_key": np.int64,
+    "break_units": np.float32,   # lowest chargeable quantity the row applies to
+    "rate": np.float32,          # per chargeable unit
+    "minimum": np.float32,       # minimum freight charge
+    "transit_days": np.int16,
+    "reliability": np.float32,
+    "carrier": np.int32,         # index into meta["carriers"]
+    "hazardous_pct": np.float32,
+    "reefer_pct": np.float32,
+    "insurance_pct": np.float32, # of the freight charge
+    "customs_fee": np.float32,   # flat, when customs clearance is requested
+}
+
+# Chargeable kg per cbm for weight-or-measure modes
+VOLUMETRIC_KG_PER_CBM = {OCEAN_LCL: 1000.0, AIR_CARGO: 167.0, LTL: 333.0}
+
+# Equipment capacity (kg, cbm) for modes priced per container or truck
+EQUIPMENT_CAPACITY = {OCEAN_FCL: (26500.0, 58.0), FTL: (24000.0, 90.0)}
+
+def chargeable_units(mode: int, weight_kg: float, volume_cbm: float) -> float:
+    """Containers or trucks for FCL/FTL, chargeable kg otherwise"""
+    if mode in EQUIPMENT_CAPACITY:
+        max_kg, max_cbm = EQUIPMENT_CAPACITY[mode]
+        return float(max(1, math.ceil(max(weight_kg / max_kg, volume_cbm / max_cbm))))
+    return max(weight_kg, volume_cbm * VOLUMETRIC_KG_PER_CBM[mode])
+
+def write_rate_card(
+    directory: Path,
+    codes: List[str],
+    carriers: List[str],
+    columns: Dict[str, np.ndarray],
+    contracted: bool = True,
+    replace: bool = True
+):
+    """
+    Sort and save tariff columns as a rate card
+
+    The card is written to a sibling directory and renamed into place. An
+    existing card at ``directory`` is swapped out when ``replace`` is set;
+    otherwise it is kept and the new one discarded, for callers racing to
+    generate the same card. Running workers keep the card they mapped
+    until they restart.
+    """
+    order = np.lexsort((columns["break_units"], columns["lane_key"]))
+    staging = Path(tempfile.mkdtemp(prefix=f".{directory.name}.", dir=directory.parent))
+    for name, dtype in COLUMNS.items():
+        np.save(staging / f"{name}.npy", np.ascontiguousarray(columns[name][order], dtype=dtype))
+    with open(staging / "meta.json", "w") as f:
+        json.dump({"codes": codes, "carriers": carriers, "modes": list(MODES),
+                   "rows": int(len(order)), "contracted": contracted}, f)
+    if not replace:
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            # Another worker finished first
+            shutil.rmtree(staging, ignore_errors=True)
+        return
+
+    previous = None
+    if directory.exists():
+        previous = directory.with_name(f".{directory.name}.old.{os.getpid()}")
+        os.rename(directory, previous)
+    try:
+        os.rename(staging, directory)
+    except OSError:
+        if previous is not None:
+            os.rename(previous, directory)
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)
+
+class RateCard:
+    """
+    Memory-mapped tariff table
+
+    ``quote`` resolves the shipment's lane once, then for each requested
+    mode finds the lane's rows with a binary search over ``lane_key`` and
+    its weight break with a second one over ``break_units``.
+    """
+
+    def __init__(self, directory: Path):
+        with open(directory / "meta.json") as f:
+            meta = json.load(f)
+        self.directory = directory
+        self.code_index = {code: i for i, code in enumerate(meta["codes"])}
+        self.carriers = meta["carriers"]
+        self.contracted = meta.get("contracted", True)
+        # Plain ndarray views of the mappings skip np.memmap's per-index overhead
+        self.columns = {
+            name: np.load(directory / f"{name}.npy", mmap_mode="r").view(np.ndarray) for name in COLUMNS
+        }
+        self.lane_key = self.columns["lane_key"]
+        self.break_units = self.columns["break_units"]
+        self.rows = len(self.lane_key)
+
+    def lane(self, details: ShipmentDetailsRequest) -> Optional[int]:
+        """Base lane key for the shipment, or None if either end is not on the card"""
+        origin = self.code_index.get(location_code(details.origin))
+        destination = self.code_index.get(location_code(details.destination))
+        if origin is None or destination is None:
+            return None
+        return (origin * len(self.code_index) + destination) * len(MODES)
+
+    def prices(self, rows: np.ndarray, units: np.ndarray, details: ShipmentDetailsRequest) -> np.ndarray:
+        """Freight charge for ``units`` at each tariff row, plus the shipment's surcharges"""
+        c = self.columns
+        freight = np.maximum(c["minimum"][rows], c["rate"][rows] * units)
+        surcharge_pct = np.zeros(len(rows))
+        if details.hazardous:
+            surcharge_pct += c["hazardous_pct"][rows]
+        if details.temperatureControlled:
+            surcharge_pct += c["reefer_pct"][rows]
+        if details.insurance:
+            surcharge_pct += c["insurance_pct"][rows]
+        total = freight * (1 + surcharge_pct)
+        if details.customsClearance:
+            total += c["customs_fee"][rows]
+        return np.round(total, 2)
+
+    def quote(self, details: ShipmentDetailsRequest) -> List[Option]:
+        """Options for every requested mode the card prices on this lane"""
+        lane = self.lane(details)
+        if lane is None:
+            return []
+        weight_kg = details.weight * 1000 if details.weightUnit == "tons" else details.weight
+        modes = [MODES.index(t) for t in dict.fromkeys(details.shipmentTypes) if t in MODES]
+        if not modes:
+            return []
+
+        keys = np.array([lane + mode for mode in modes], dtype=np.int64)
+        starts = self.lane_key.searchsorted(keys, side="left").tolist()
+        ends = self.lane_key.searchsorted(keys, side="right").tolist()
+        priced, rows, units = [], [], []
+        for mode, start, end in zip(modes, starts, ends):
+            if start == end:
+                continue
+            quantity = chargeable_units(mode, weight_kg, details.volume)
+            # Last break at or below the chargeable quantity (first break if below all)
+            position = int(self.break_units[start:end].searchsorted(quantity, side="right"))
+            priced.append(mode)
+            rows.append(start + max(position - 1, 0))
+            units.append(quantity)
+        if not rows:
+            return []
+
+        rows = np.array(rows)
+        c = self.columns
+        prices = self.prices(rows, np.array(units), details).tolist()
+        days = c["transit_days"][rows].tolist()
+        reliability = np.round(c["reliability"][rows].astype(np.float64), 3).tolist()
+        carriers = c["carrier"][rows].tolist()
+        return [
+            Option(
+                mode=MODES[mode],
+                price=prices[i],
+                transitDays=days[i],
+                route=_route_legs(mode, details, days[i], self.carriers[carriers[i]]),
+                reliability=reliability[i],
+            )
+            for i, mode in enumerate(priced)
+        ]
+
+def _route_legs(mode: int, details: ShipmentDetailsRequest, days: int, carrier: str) -> List[Leg]:
+    """Door-to-door legs for a rate-card option"""
+    if mode in (FTL, LTL):
+        return [Leg("Truck", details.origin, details.destination, f"{days} days", carrier)]
+    main, terminal = ("Ocean", "Port") if mode in (OCEAN_FCL, OCEAN_LCL) else ("Air", "Airport")
+    drayage = "1 day"
+    main_days = max(1, days - 2)
+    return [
+        Leg("Truck", details.origin, f"{details.origin} {terminal}", drayage),
+        Leg(main, f"{details.origin} {terminal}", f"{details.destination} {terminal}", f"{main_days} days", carrier),
+        Leg("Truck", f"{details.destination} {terminal}", details.destination, drayage),
+    ]
+
+# Reference tariff per mode: rate = (base + per_km * km) * break discount,
+# transit = handling + km / speed. Rough market levels for the bundled network.
+REFERENCE_TARIFFS = {
+    OCEAN_FCL: {"base": 800.0, "per_km": 0.09, "breaks": [(1, 1.0), (3, 0.95), (10, 0.9)], "minimum": 0.0,
+                "speed": 700.0, "handling": 6.0, "reliability": 0.88, "surcharges": (0.25, 0.35)},
+    OCEAN_LCL: {"base": 0.03, "per_km": 4.5e-6, "breaks": [(0, 1.0), (1000, 0.9), (5000, 0.8), (10000, 0.75)],
+                "minimum": 120.0, "speed": 700.0, "handling": 9.0, "reliability": 0.84, "surcharges": (0.25, 0.35)},
+    AIR_CARGO: {"base": 0.9, "per_km": 4.2e-4, "breaks": [(0, 1.0), (45, 0.85), (100, 0.75), (300, 0.68), (500, 0.62), (1000, 0.58)],
+                "minimum": 150.0, "speed": 6000.0, "handling": 3.0, "reliability": 0.95, "surcharges": (0.5, 0.3)},
+    FTL: {"base": 300.0, "per_km": 1.6, "breaks": [(1, 1.0), (5, 0.95)], "minimum": 0.0,
+          "speed": 600.0, "handling": 0.5, "reliability": 0.92, "surcharges": (0.3, 0.25)},
+    LTL: {"base": 0.08, "per_km": 1.2e-4, "breaks": [(0, 1.0), (500, 0.88), (1000, 0.8), (2000, 0.72), (5000, 0.65)],
+          "minimum": 90.0, "speed": 450.0, "handling": 1.5, "reliability": 0.88, "surcharges": (0.3, 0.25)},
+}
+
+REFERENCE_INSURANCE_PCT = 0.015
+REFERENCE_CUSTOMS_FEE = 150.0
+
+def reference_rate_card(directory: Path, network_path: Path = NETWORK_PATH):
+    """Write a reference card for every lane of the bundled network, priced from distance"""
+    with open(network_path) as f:
+        network = json.load(f)
+    cities = network["cities"]
+    codes = [city["code"] for city in cities]
+    distances = get_distance_service()
+    rows: Dict[str, List[float]] = {name: [] for name in COLUMNS}
+
+    for i, a in enumerate(cities):
+        for j, b in enumerate(cities):
+            if i == j:
+                continue
+            km_by_mode = {}
+            if a.get("port") and b.get("port"):
+                sea = distances.sea_km[distances.port_index[a["code"]], distances.port_index[b["code"]]]
+                if np.isfinite(sea):
+                    km_by_mode[OCEAN_FCL] = km_by_mode[OCEAN_LCL] = float(sea)
+            if a.get("airport") and b.get("airport"):
+                km_by_mode[AIR_CARGO] = great_circle_km(a["lat"], a["lon"], b["lat"], b["lon"]) * 1.05
+            if a["landmass"] == b["landmass"]:
+                road = great_circle_km(a["lat"], a["lon"], b["lat"], b["lon"]) * 1.25
+                if road <= network["max_road_km"]:
+                    km_by_mode[FTL] = km_by_mode[LTL] = road
+
+            lane = (i * len(codes) + j) * len(MODES)
+            for mode, km in km_by_mode.items():
+                tariff = REFERENCE_TARIFFS[mode]
+                rate = tariff["base"] + tariff["per_km"] * km
+                hazardous, reefer = tariff["surcharges"]
+                for break_units, discount in tariff["breaks"]:
+                    rows["lane_key"].append(lane + mode)
+                    rows["break_units"].append(break_units)
+                    rows["rate"].append(rate * discount)
+                    rows["minimum"].append(tariff["minimum"])
+                    rows["transit_days"].append(max(1, math.ceil(tariff["handling"] + km / tariff["speed"])))
+                    rows["reliability"].append(tariff["reliability"])
+                    rows["carrier"].append(0)
+                    rows["hazardous_pct"].append(hazardous)
+                    rows["reefer_pct"].append(reefer)
+                    rows["insurance_pct"].append(REFERENCE_INSURANCE_PCT)
+                    rows["customs_fee"].append(REFERENCE_CUSTOMS_FEE)
+
+    columns = {name: np.asarray(values) for name, values in rows.items()}
+    write_rate_card(directory, codes, ["Reference Tariff"], columns, contracted=False, replace=False)
+
+def import_csv(source: Path, directory: Path):
+    """
+    Build a contracted rate card from CSV with columns origin, destination
+    (UN/LOCODE or place names), mode, break_units, rate, minimum,
+    transit_days, reliability, carrier and optional surcharge columns
+    """
+    codes: Dict[str, int] = {}
+    carriers: Dict[str, int] = {}
+    rows: Dict[str, List[float]] = {name: [] for name in COLUMNS}
+    lanes: List[Tuple[int, int, int]] = []
+    with open(source, newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            origin = codes.setdefault(location_code(record["origin"]), len(codes))
+            destination = codes.setdefault(location_code(record["destination"]), len(codes))
+            lanes.append((origin, destination, MODES.index(record["mode"])))
+            rows["carrier"].append(carriers.setdefault(record.get("carrier") or "Contract", len(carriers)))
+            for name in ("break_units", "rate", "minimum", "transit_days", "reliability"):
+                rows[name].append(float(record[name]))
+            for name in ("hazardous_pct", "reefer_pct", "insurance_pct", "customs_fee"):
+                rows[name].append(float(record.get(name) or 0))
+
+    # Lane keys depend on the final number of codes
+    n = len(codes)
+    rows["lane_key"] = [(o * n + d) * len(MODES) + m for o, d, m in lanes]
+    columns = {name: np.asarray(values) for name, values in rows.items()}
+    write_rate_card(directory, list(codes), list(carriers), columns)
+    logger.info(f"Imported {len(lanes)} tariff rows into {directory}")
+
+@lru_cache(maxsize=1)
+def get_rate_card() -> RateCard:
+    """
+    Process-wide rate card: the contracted card in ``rate_card_dir`` if
+    set, else a reference card generated once per network version
+    """
+    if settings.rate_card_dir:
+        card = RateCard(Path(settings.rate_card_dir))
+    else:
+        digest = hashlib.sha1(NETWORK_PATH.read_bytes()).hexdigest()[:12]
+        directory = Path(tempfile.gettempdir()) / f"reference_rates_{digest}"
+        if not (directory / "meta.json").exists():
+            reference_rate_card(directory)
+        card = RateCard(directory)
+    logger.info(f"Rate card loaded: {card.rows} tariff rows from {card.directory}")
+    return card
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    import_csv(Path(sys.argv[1]), Path(sys.argv[2]))
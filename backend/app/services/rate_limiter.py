@@ -0,0 +1,259 @@
+"""
+Client-side rate limiting for provider API keys
+Paces outbound calls with a per-provider token bucket, serving interactive
+requests ahead of batch work
+"""
+import time
+import heapq
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Optional, List, Dict, Any, Tuple
+
+from app.config import settings
+from app.services.metrics import PROVIDER_QUEUE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+INTERACTIVE = 0
+BATCH = 1
+
+# Priority of the current request; batch endpoints set BATCH for their work
+request_priority: ContextVar[int] = ContextVar("request_priority", default=INTERACTIVE)
+
+class TokenBucketBackend:
+    """
+    Token bucket storage, expressed as GCRA (generic cell rate algorithm):
+    each key keeps the theoretical arrival time of its next token
+    """
+
+    async def reserve(self, key: str, rate: float, burst: int) -> float:
+        """Take one token, returning how long to wait before it may be used"""
+        raise NotImplementedError
+
+    async def try_take(self, key: str, rate: float, burst: int) -> bool:
+        """Take one token only if it is available right now"""
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+class InMemoryTokenBucket(TokenBucketBackend):
+    """Per-process buckets; each worker gets the full budget"""
+
+    def __init__(self):
+        self._tat: Dict[str, float] = {}
+
+    def _take(self, key: str, rate: float, burst: int, force: bool) -> float:
+        now = time.monotonic()
+        interval = 1.0 / rate
+        tat = max(self._tat.get(key, now), now) + interval
+        wait = tat - burst * interval - now
+        if wait <= 0 or force:
+            self._tat[key] = tat
+        return max(wait, 0.0)
+
+    async def reserve(self, key: str, rate: float, burst: int) -> float:
+        return self._take(key, rate, burst, force=True)
+
+    async def try_take(self, key: str, rate: float, burst: int) -> bool:
+        return self._take(key, rate, burst, force=False) == 0.0
+
+# KEYS[1] = bucket, ARGV = interval, burst, force -> wait in seconds (as a string)
+_GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+tat = tat + interval
+local wait = tat - burst * interval - now
+if wait <= 0 or ARGV[3] == '1' then
+  redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000) + 1000)
+end
+if wait < 0 then wait = 0 end
+return tostring(wait)
+"""
+
+class RedisTokenBucket(TokenBucketBackend):
+    """Buckets shared by every worker (requires the ``redis`` package)"""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from e
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(_GCRA_SCRIPT)
+        self.prefix = prefix
+
+    async def _take(self, key: str, rate: float, burst: int, force: bool) -> float:
+        wait = await self._script(keys=[self.prefix + key], args=[1.0 / rate, burst, "1" if force else "0"])
+        return float(wait)
+
+    async def reserve(self, key: str, rate: float, burst: int) -> float:
+        return await self._take(key, rate, burst, force=True)
+
+    async def try_take(self, key: str, rate: float, burst: int) -> bool:
+        return await self._take(key, rate, burst, force=False) == 0.0
+
+    async def aclose(self):
+        await self._redis.aclose()
+
+class ProviderRateLimiter:
+    """
+    Priority queue in front of one provider's token bucket.
+
+    A dispatcher task reserves a token, sleeps until it is usable, then
+    hands it to the highest-priority caller waiting at that moment, so an
+    interactive request that arrives during the sleep still goes before
+    queued batch work. Callers that give up (cancelled) leave the queue.
+    """
+
+    def __init__(self, provider: str, rate: float, burst: int, backend: TokenBucketBackend):
+        self.provider = provider
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.backend = backend
+        self._waiting: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.granted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, future in self._waiting if not future.done())
+
+    async def acquire(self, priority: Optional[int] = None):
+        """Wait for this provider's next token"""
+        if not self.enabled:
+            return
+        if priority is None:
+            priority = request_priority.get()
+
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._waiting, (priority, self._seq, future))
+        self._ensure_dispatcher()
+        self._wakeup.set()
+
+        started = time.monotonic()
+        await future
+        waited = time.monotonic() - started
+        self.granted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        PROVIDER_QUEUE_SECONDS.labels(self.provider).observe(waited)
+
+    async def try_acquire(self) -> bool:
+        """Take a token only if one is free right now (used for optional work such as hedges)"""
+        if not self.enabled:
+            return True
+        if self.queue_depth:
+            return False
+        try:
+            return await self.backend.try_take(self.provider, self.rate, self.burst)
+        except Exception as e:
+            logger.error(f"Rate limiter backend failed for {self.provider}: {e}")
+            return False
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    def _pop_waiter(self) -> Optional[asyncio.Future]:
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                return future
+        return None
+
+    async def _dispatch(self):
+        while True:
+            if not self.queue_depth:
+                self._waiting.clear()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            try:
+                wait = await self.backend.reserve(self.provider, self.rate, self.burst)
+            except Exception as e:
+                # Fail open: a broken shared backend must not block quoting
+                logger.error(f"Rate limiter backend failed for {self.provider}: {e}")
+                wait = 0.0
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            future = self._pop_waiter()
+            if future is not None:
+                future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ratePerSecond": self.rate,
+            "burst": self.burst,
+            "queueDepth": self.queue_depth,
+            "granted": self.granted,
+            "avgWaitMs": round(1000 * self.total_wait / self.granted, 2) if self.granted else 0.0,
+            "maxWaitMs": round(1000 * self.max_wait, 2),
+        }
+
+    async def aclose(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+
+class RateLimitScheduler:
+    """Token-bucket limiters for every provider, sharing one backend"""
+
+    def __init__(self, backend: Optional[TokenBucketBackend] = None):
+        self._backend = backend
+        self._limiters: Dict[str, ProviderRateLimiter] = {}
+
+    @property
+    def backend(self) -> TokenBucketBackend:
+        if self._backend is None:
+            if settings.rate_limit_backend == "redis":
+                self._backend = RedisTokenBucket(settings.redis_url)
+            else:
+                self._backend = InMemoryTokenBucket()
+        return self._backend
+
+    def limiter(self, provider: str) -> ProviderRateLimiter:
+        limiter = self._limiters.get(provider)
+        if limiter is None:
+            rate = getattr(settings, f"{provider}_rate_limit", 0.0)
+            burst = getattr(settings, f"{provider}_rate_burst", 1)
+            limiter = ProviderRateLimiter(provider, rate, burst, self.backend)
+            self._limiters[provider] = limiter
+        return limiter
+
+    async def acquire(self, provider: str, priority: Optional[int] = None):
+        await self.limiter(provider).acquire(priority)
+
+    async def try_acquire(self, provider: str) -> bool:
+        return await self.limiter(provider).try_acquire()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+    async def aclose(self):
+        for limiter in self._limiters.values():
+            await limiter.aclose()
+        if self._backend is not None:
+            await self._backend.aclose()
+            self._backend = None
+
+# Process-wide scheduler, closed on app shutdown
+rate_limiter = RateLimitScheduler()
@@ -0,0 +1,383 @@
+"""
+Multimodal route search
+Searches a prebuilt network of cities, ports, airports and rail terminals
+"""
+import json
+import math
+import heapq
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple, FrozenSet
+
+import numpy as np
+
+from app.utils.helpers import EARTH_RADIUS_KM, great_circle_km
+from app.services.locations import resolve_location
+
+logger = logging.getLogger(__name__)
+
+NETWORK_PATH = Path(__file__).resolve().parent.parent / "data" / "network.json"
+
+TRUCK, RAIL, OCEAN, AIR = range(4)
+MODE_NAMES = ("Truck", "Rail", "Ocean", "Air")
+
+# Per-mode planning assumptions: effective speed, handling time per leg,
+# cost per chargeable ton-km, fixed cost per leg and detour over great-circle
+MODE_PROFILES = {
+    TRUCK: {"speed_km_day": 600, "handling_days": 0.5, "rate_ton_km": 0.12, "fixed": 150, "detour": 1.25},
+    RAIL: {"speed_km_day": 650, "handling_days": 2.0, "rate_ton_km": 0.045, "fixed": 300, "detour": 1.3},
+    OCEAN: {"speed_km_day": 550, "handling_days": 3.0, "rate_ton_km": 0.008, "fixed": 400, "detour": 1.35},
+    AIR: {"speed_km_day": 6000, "handling_days": 1.5, "rate_ton_km": 0.45, "fixed": 250, "detour": 1.05},
+}
+
+# Volumetric ratio (cbm per chargeable ton) for each mode
+VOLUMETRIC_CBM_PER_TON = {TRUCK: 3.0, RAIL: 1.0, OCEAN: 1.0, AIR: 6.0}
+
+# Distance for first/last-mile moves between a city and its own terminals
+LOCAL_DRAYAGE_KM = 40.0
+
+# Shortest great-circle hop worth a main-haul leg; nearer terminals are trucked
+MIN_TRUNK_KM = {OCEAN: 300.0, AIR: 800.0}
+
+MAX_LEGS = 7
+
+PATH_CACHE_SIZE = 8192
+
+def _leg_days(mode: int, km: float) -> float:
+    profile = MODE_PROFILES[mode]
+    return profile["handling_days"] + km / profile["speed_km_day"]
+
+def _format_duration(days: float) -> str:
+    days = max(1, math.ceil(days))
+    return "1 day" if days == 1 else f"{days} days"
+
+class RouteGraph:
+    """
+    Multimodal network in compressed sparse row form
+
+    Node metadata lives in parallel lists; edges are stored as flat NumPy
+    arrays (target, mode, distance, transit days) indexed by ``indptr`` so a
+    search only touches contiguous slices. ``terminals`` maps each city node
+    to its own port, airport and rail terminal nodes by mode.
+    """
+
+    def __init__(
+        self,
+        names: List[str],
+        coords: List[Tuple[float, float]],
+        city_codes: Dict[str, int],
+        edges: List[Tuple[int, int, int, float]],
+        terminals: Optional[Dict[int, Dict[int, int]]] = None,
+    ):
+        self.names = names
+        self.city_codes = city_codes
+        self.terminals = terminals or {}
+        self.lat = np.radians([c[0] for c in coords])
+        self.lon = np.radians([c[1] for c in coords])
+
+        edges = sorted(edges)
+        n = len(names)
+        sources = np.array([e[0] for e in edges], dtype=np.int32)
+        self.indptr = np.searchsorted(sources, np.arange(n + 1)).astype(np.int32)
+        self.indices = np.array([e[1] for e in edges], dtype=np.int32)
+        self.edge_mode = np.array([e[2] for e in edges], dtype=np.int8)
+        self.edge_km = np.array([e[3] for e in edges], dtype=np.float32)
+        self.edge_days = np.array([_leg_days(e[2], e[3]) for e in edges], dtype=np.float32)
+        self.edge_source = np.array([e[0] for e in edges], dtype=np.int32)
+        is_city = np.zeros(n, dtype=bool)
+        is_city[list(city_codes.values())] = True
+        self._road_edge = (self.edge_mode == TRUCK) & is_city[self.edge_source] & is_city[self.indices]
+
+        # Plain-list mirrors: scalar indexing into lists is much faster than
+        # into NumPy arrays inside the search loop
+        self._indptr = self.indptr.tolist()
+        self._indices = self.indices.tolist()
+        self._edge_mode = self.edge_mode.tolist()
+
+        self._family_paths = lru_cache(maxsize=PATH_CACHE_SIZE)(self._search_family)
+
+    @classmethod
+    def load(cls, path: Path = NETWORK_PATH) -> "RouteGraph":
+        """Build the graph from the bundled network description"""
+        with open(path) as f:
+            network = json.load(f)
+
+        names: List[str] = []
+        coords: List[Tuple[float, float]] = []
+        city_codes: Dict[str, int] = {}
+        terminals: Dict[Tuple[str, int], int] = {}
+        city_terminals: Dict[int, Dict[int, int]] = {}
+        edges: List[Tuple[int, int, int, float]] = []
+
+        def add_node(name: str, lat: float, lon: float) -> int:
+            names.append(name)
+            coords.append((lat, lon))
+            return len(names) - 1
+
+        def connect(u: int, v: int, mode: int, km: float):
+            edges.append((u, v, mode, km))
+            edges.append((v, u, mode, km))
+
+        cities = network["cities"]
+        for city in cities:
+            node = add_node(city["name"], city["lat"], city["lon"])
+            city_codes[city["code"].upper()] = node
+            city_terminals[node] = {}
+            for mode, enabled, suffix in (
+                (OCEAN, city.get("port"), "Port"),
+                (AIR, city.get("airport"), "Airport"),
+                (RAIL, city.get("rail"), "Rail Terminal"),
+            ):
+                if enabled:
+                    terminal = add_node(f"{city['name']} {suffix}", city["lat"], city["lon"])
+                    terminals[(city["code"], mode)] = terminal
+                    city_terminals[node][mode] = terminal
+                    connect(node, terminal, TRUCK, LOCAL_DRAYAGE_KM)
+
+        def trunk_km(u: int, v: int, mode: int) -> float:
+            return great_circle_km(*coords[u], *coords[v]) * MODE_PROFILES[mode]["detour"]
+
+        # Ocean and air: every terminal pair far enough apart; road: nearby cities on the same landmass
+        for mode in (OCEAN, AIR):
+            nodes = [terminals[(c["code"], mode)] for c in cities if (c["code"], mode) in terminals]
+            for i, u in enumerate(nodes):
+                for v in nodes[i + 1:]:
+                    if great_circle_km(*coords[u], *coords[v]) >= MIN_TRUNK_KM[mode]:
+                        connect(u, v, mode, trunk_km(u, v, mode))
+
+        for i, a in enumerate(cities):
+            for b in cities[i + 1:]:
+                if a["landmass"] != b["landmass"]:
+                    continue
+                u, v = city_codes[a["code"]], city_codes[b["code"]]
+                km = trunk_km(u, v, TRUCK)
+                if km <= network["max_road_km"]:
+                    connect(u, v, TRUCK, km)
+
+        for a, b in network["rail_corridors"]:
+            u, v = terminals[(a, RAIL)], terminals[(b, RAIL)]
+            connect(u, v, RAIL, trunk_km(u, v, RAIL))
+
+        graph = cls(names, coords, city_codes, edges, city_terminals)
+        logger.info(f"Route graph loaded: {len(names)} nodes, {len(graph.indices)} edges")
+        return graph
+
+    def find_city(self, location: str) -> Optional[int]:
+        """Resolve a free-text location ("Shanghai, China", "PVG", "CNSHA") to a city node"""
+        resolved = resolve_location(location)
+        if resolved is None:
+            return None
+        return self.city_codes.get(resolved.locode)
+
+    def chargeable_tons(self, weight_tons: float, volume_cbm: float) -> np.ndarray:
+        """Chargeable tons of a cargo in each mode (weight or volumetric weight)"""
+        return np.array([
+            max(weight_tons, volume_cbm / VOLUMETRIC_CBM_PER_TON[m]) for m in range(4)
+        ])
+
+    def rates_per_km(self, weight_tons: float, volume_cbm: float) -> np.ndarray:
+        """Cost per km of each mode for a given cargo"""
+        rate = np.array([MODE_PROFILES[m]["rate_ton_km"] for m in range(4)])
+        return rate * self.chargeable_tons(weight_tons, volume_cbm)
+
+    def edge_costs(self, weight_tons: float, volume_cbm: float) -> np.ndarray:
+        """Estimated cost of every edge for a given cargo"""
+        fixed = np.array([MODE_PROFILES[m]["fixed"] for m in range(4)])
+        modes = self.edge_mode
+        return fixed[modes] + self.rates_per_km(weight_tons, volume_cbm)[modes] * self.edge_km
+
+    def great_circle_to(self, target: int) -> np.ndarray:
+        """Great-circle km from every node to ``target``"""
+        dlat = self.lat - self.lat[target]
+        dlon = self.lon - self.lon[target]
+        a = np.sin(dlat / 2) ** 2 + np.cos(self.lat) * np.cos(self.lat[target]) * np.sin(dlon / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+    def k_shortest(
+        self,
+        source: int,
+        target: int,
+        weights: np.ndarray,
+        k: int,
+        required: int = 0,
+        heuristic: Optional[np.ndarray] = None,
+        max_legs: int = MAX_LEGS,
+        ordered: bool = False,
+    ) -> List[Tuple[int, ...]]:
+        """
+        Up to k cheapest loopless paths (as edge-id tuples) under ``weights``
+
+        A* label-setting search over (node, main-haul modes used) states, each
+        settled at most k times. A path only counts when the set of non-truck
+        modes it used equals the ``required`` bitmask. Edges with infinite
+        weight are skipped. ``heuristic`` must be a lower bound on the
+        remaining cost from each node. With ``ordered``, main-haul modes are
+        used in increasing mode order (rail, ocean, air).
+        """
+        indptr, indices, edge_mode = self._indptr, self._indices, self._edge_mode
+        weights = weights.tolist()
+        h = heuristic.tolist() if heuristic is not None else [0.0] * len(self.names)
+        settled: Dict[Tuple[int, int], int] = {}
+        heap = [(h[source], 0.0, 0, source, 0, (), (source,))]
+        counter = 1
+        paths: List[Tuple[int, ...]] = []
+
+        while heap and len(paths) < k:
+            _, cost, _, node, used, path, visited = heapq.heappop(heap)
+            state = (node, used)
+            if settled.get(state, 0) >= k:
+                continue
+            settled[state] = settled.get(state, 0) + 1
+            if node == target:
+                if used == required:
+                    paths.append(path)
+                continue
+            if len(path) >= max_legs:
+                continue
+            for e in range(indptr[node], indptr[node + 1]):
+                w = weights[e]
+                v = indices[e]
+                if w == math.inf or v in visited:
+                    continue
+                mode = edge_mode[e]
+                if ordered and mode != TRUCK and used >> (mode + 1):
+                    continue
+                next_used = used if mode == TRUCK else used | (1 << mode)
+                if settled.get((v, next_used), 0) >= k:
+                    continue
+                g = cost + w
+                heapq.heappush(
+                    heap,
+                    (g + h[v], g, counter, v, next_used, path + (e,), visited + (v,))
+                )
+                counter += 1
+
+        return paths
+
+    def describe(
+        self,
+        path: Tuple[int, ...],
+        costs: np.ndarray,
+        origin: str,
+        destination: str,
+    ) -> Dict[str, Any]:
+        """Turn an edge path into legs and route totals"""
+        legs = []
+        node = None
+        for i, e in enumerate(path):
+            mode = int(self.edge_mode[e])
+            target = int(self.indices[e])
+            legs.append({
+                "mode": MODE_NAMES[mode],
+                "origin": origin if i == 0 else self.names[node],
+                "destination": destination if i == len(path) - 1 else self.names[target],
+                "duration": _format_duration(float(self.edge_days[e])),
+                "distance_km": round(float(self.edge_km[e]), 1),
+            })
+            node = target
+
+        edges = np.array(path, dtype=np.int64)
+        return {
+            "legs": legs,
+            "distanceKm": round(float(self.edge_km[edges].sum()), 1),
+            "transitDays": max(1, math.ceil(float(self.edge_days[edges].sum()))),
+            "estimatedCost": round(float(costs[edges].sum()), 2),
+        }
+
+    def _search_family(
+        self,
+        source: int,
+        target: int,
+        family: FrozenSet[int],
+        chargeable: Tuple[float, ...],
+        k: int,
+    ) -> Tuple[Tuple[int, ...], ...]:
+        """
+        k cheapest paths whose main-haul modes are exactly ``family``
+
+        Edge costs depend on the cargo only through the chargeable tons of
+        the allowed modes, so ``chargeable`` (zero for the other modes) is
+        the exact memo key. Between cities, trucks only bring cargo to the
+        first main-haul terminal and from the last one, and an origin or
+        destination with its own terminal for the family must use it:
+        long road moves would otherwise win whenever they shorten an
+        expensive air leg. Sea-air routes sail first and fly second.
+        """
+        allowed = np.zeros(4, dtype=bool)
+        allowed[TRUCK] = True
+        allowed[list(family)] = True
+        fixed = np.array([MODE_PROFILES[m]["fixed"] for m in range(4)])
+        per_km = np.array([MODE_PROFILES[m]["rate_ton_km"] for m in range(4)]) * np.array(chargeable)
+        modes = self.edge_mode
+        weights = np.where(allowed[modes], fixed[modes] + per_km[modes] * self.edge_km, np.inf)
+        if family:
+            # Road moves are pre- and on-carriage only
+            first_mile = self.edge_source == source
+            last_mile = self.indices == target
+            if family & self.terminals.get(source, {}).keys():
+                first_mile[:] = False
+            if family & self.terminals.get(target, {}).keys():
+                last_mile[:] = False
+            weights[self._road_edge & ~first_mile & ~last_mile] = np.inf
+        required = sum(1 << mode for mode in family)
+        # Every km still to cover costs at least the cheapest allowed rate
+        heuristic = self.great_circle_to(target) * per_km[allowed].min()
+        return tuple(self.k_shortest(source, target, weights, k, required, heuristic, ordered=True))
+
+    def plan(
+        self,
+        origin: str,
+        destination: str,
+        shipment_types: List[str],
+        weight_tons: float,
+        volume_cbm: float,
+        k: int = 3,
+    ) -> List[Dict[str, Any]]:
+        """
+        Candidate multimodal routes for a shipment, cheapest first
+
+        One search runs per route family allowed by the shipment types
+        (ocean, air, rail, sea-air, truck); each returns up to k routes whose
+        main-haul modes are exactly that family's, so routes never repeat
+        across families.
+        """
+        source, target = self.find_city(origin), self.find_city(destination)
+        if source is None or target is None or source == target:
+            return []
+
+        ocean = any("Ocean" in t for t in shipment_types)
+        air = "Air Cargo" in shipment_types
+        trucking = "FTL Trucking" in shipment_types or "LTL Trucking" in shipment_types
+
+        families: List[Tuple[str, FrozenSet[int]]] = []
+        if ocean:
+            families.append(("Ocean", frozenset({OCEAN})))
+        if air:
+            families.append(("Air", frozenset({AIR})))
+        if ocean or trucking:
+            families.append(("Rail", frozenset({RAIL})))
+        if ocean and air:
+            families.append(("Sea-Air", frozenset({OCEAN, AIR})))
+        if trucking:
+            families.append(("Truck", frozenset()))
+
+        # Searches are memoized on the chargeable tons they actually depend on
+        chargeable = self.chargeable_tons(weight_tons, volume_cbm).tolist()
+        costs = self.edge_costs(weight_tons, volume_cbm)
+        routes = []
+        for label, family in families:
+            key = tuple(c if m == TRUCK or m in family else 0.0 for m, c in enumerate(chargeable))
+            paths = self._family_paths(source, target, family, key, k)
+            for path in paths:
+                route = self.describe(path, costs, origin, destination)
+                route["mode"] = label
+                routes.append(route)
+
+        routes.sort(key=lambda r: r["estimatedCost"])
+        return routes
+
+@lru_cache(maxsize=1)
+def get_route_graph() -> RouteGraph:
+    """Process-wide route graph, built once on first use"""
+    return RouteGraph.load()
@@ -0,0 +1,81 @@
+"""
+Batched scoring of shipping options
+Scores whole option sets in one NumPy pass over columnar arrays
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.services.options import OptionLike
+
+DEFAULT_PRIORITIES = {"cost": 0.5, "speed": 0.3, "reliability": 0.2}
+DEFAULT_RELIABILITY = 0.85
+
+class OptionColumns:
+    """Struct-of-arrays view over a list of shipping options"""
+
+    def __init__(self, options: List[OptionLike]):
+        n = len(options)
+        self.price = np.fromiter((o.price for o in options), dtype=np.float64, count=n)
+        self.transit_days = np.fromiter((o.transitDays for o in options), dtype=np.float64, count=n)
+        self.reliability = np.fromiter(
+            (DEFAULT_RELIABILITY if o.reliability is None else o.reliability for o in options),
+            dtype=np.float64,
+            count=n,
+        )
+        self.carbon = np.fromiter(
+            (np.nan if o.carbonFootprint is None else o.carbonFootprint for o in options),
+            dtype=np.float64,
+            count=n,
+        )
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+def _relative_saving(values: np.ndarray) -> np.ndarray:
+    """1 - value / max(value); options with unknown values score 0"""
+    peak = np.nanmax(values) if np.any(~np.isnan(values)) else 0.0
+    if peak <= 0:
+        return np.zeros_like(values)
+    return np.nan_to_num(1 - values / peak, nan=0.0)
+
+# Row order of score_components and priority_weights
+COMPONENTS = ("cost", "speed", "reliability", "carbon")
+
+def score_components(columns: OptionColumns) -> np.ndarray:
+    """
+    Unweighted per-option scores, one row per entry of COMPONENTS
+
+    Cost, speed and carbon score as the saving relative to the worst option;
+    reliability scores as-is. Depends only on the option set, so it can be
+    kept and re-weighted when priorities change.
+    """
+    return np.vstack([
+        _relative_saving(columns.price),
+        _relative_saving(columns.transit_days),
+        columns.reliability,
+        _relative_saving(columns.carbon),
+    ])
+
+def priority_weights(priorities: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """
+    Weight vector in COMPONENTS order; missing cost/speed/reliability
+    weights fall back to DEFAULT_PRIORITIES, carbon defaults to 0
+    """
+    priorities = priorities or DEFAULT_PRIORITIES
+    return np.array(
+        [float(priorities.get(key, DEFAULT_PRIORITIES.get(key, 0.0))) for key in COMPONENTS],
+        dtype=np.float64,
+    )
+
+def score_options(columns: OptionColumns, priorities: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Weighted score per option (higher is better)"""
+    return priority_weights(priorities) @ score_components(columns)
+
+def top_k(scores: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """Indices of the k best scores, best first (all options when k is None)"""
+    n = len(scores)
+    if k is None or k >= n:
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
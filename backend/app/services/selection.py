@@ -0,0 +1,64 @@
+"""
+Multi-objective selection over shipping options
+Cheapest / fastest / best-value picks and the Pareto frontier
+"""
+import math
+from typing import List, Tuple
+
+from app.services.options import OptionLike
+from app.services.scoring import DEFAULT_RELIABILITY
+
+def select_options(
+    options: List[OptionLike]
+) -> Tuple[OptionLike, OptionLike, OptionLike]:
+    """
+    Cheapest, fastest and best-value (lowest price per transit day) in one pass
+
+    Ties resolve to the earliest option, matching ``min`` over the list.
+    """
+    cheapest = fastest = best_value = options[0]
+    best_ratio = best_value.price / max(best_value.transitDays, 1)
+
+    for option in options[1:]:
+        if option.price < cheapest.price:
+            cheapest = option
+        if option.transitDays < fastest.transitDays:
+            fastest = option
+        ratio = option.price / max(option.transitDays, 1)
+        if ratio < best_ratio:
+            best_value, best_ratio = option, ratio
+
+    return cheapest, fastest, best_value
+
+def _objectives(option: OptionLike) -> Tuple[float, float, float, float]:
+    """Minimization vector: price, transit days, carbon, negated reliability"""
+    carbon = math.inf if option.carbonFootprint is None else option.carbonFootprint
+    reliability = DEFAULT_RELIABILITY if option.reliability is None else option.reliability
+    return (option.price, option.transitDays, carbon, -reliability)
+
+def _dominates(a: Tuple[float, ...], b: Tuple[float, ...]) -> bool:
+    return all(x <= y for x, y in zip(a, b)) and a != b
+
+def pareto_frontier(options: List[OptionLike]) -> List[OptionLike]:
+    """
+    Non-dominated options over price, transit days, carbon footprint and reliability
+
+    Sort-filter skyline: after a lexicographic sort no option can be dominated
+    by a later one, so each candidate is only checked against the frontier
+    found so far. That is O(n log n + n * f) for a frontier of size f, so
+    O(n^2) in the worst case where every option is non-dominated; the
+    O(n log n) sweeps only exist for two or three objectives, not four.
+    Duplicate objective vectors keep the first option only. The frontier is
+    returned cheapest first.
+    """
+    keyed = sorted(((_objectives(o), i) for i, o in enumerate(options)))
+
+    frontier: List[Tuple[Tuple[float, ...], int]] = []
+    for vector, index in keyed:
+        if frontier and frontier[-1][0] == vector:
+            continue
+        if any(_dominates(kept, vector) for kept, _ in frontier):
+            continue
+        frontier.append((vector, index))
+
+    return [options[index] for _, index in frontier]
@@ -0,0 +1,71 @@
+"""
+Server-side option sessions
+Keeps each quote's option set under its requestId so /agent/recommend can
+re-rank by priorities without the client re-sending the options
+"""
+import time
+from collections import OrderedDict
+from typing import Optional, List
+
+import numpy as np
+
+from app.config import settings
+from app.models.schemas import ShipmentDetailsRequest
+from app.services.options import Option
+from app.services.scoring import OptionColumns, score_components
+
+class OptionSession:
+    """One quote's options plus their unweighted score components, built on first re-rank"""
+
+    __slots__ = ("details", "options", "expires_at", "_components")
+
+    def __init__(self, details: ShipmentDetailsRequest, options: List[Option], expires_at: float):
+        self.details = details
+        self.options = options
+        self.expires_at = expires_at
+        self._components: Optional[np.ndarray] = None
+
+    @property
+    def components(self) -> np.ndarray:
+        if self._components is None:
+            self._components = score_components(OptionColumns(self.options))
+        return self._components
+
+class OptionSessionStore:
+    """
+    Per-process LRU of option sessions with expiry
+
+    Sessions live for ``ttl`` seconds from the quote; the least recently
+    used are evicted beyond ``max_entries``. Each worker keeps its own
+    store, so a client routed to another worker falls back to sending
+    the options.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_entries = max_entries or settings.option_session_max_entries
+        self.ttl = settings.option_session_ttl if ttl is None else ttl
+        self._sessions: "OrderedDict[str, OptionSession]" = OrderedDict()
+
+    def put(self, request_id: str, details: ShipmentDetailsRequest, options: List[Option]):
+        if self.ttl <= 0:
+            return
+        self._sessions[request_id] = OptionSession(details, options, time.monotonic() + self.ttl)
+        self._sessions.move_to_end(request_id)
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+
+    def get(self, request_id: str) -> Optional[OptionSession]:
+        session = self._sessions.get(request_id)
+        if session is None:
+            return None
+        if session.expires_at <= time.monotonic():
+            del self._sessions[request_id]
+            return None
+        self._sessions.move_to_end(request_id)
+        return session
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+# Process-wide session store
+option_sessions = OptionSessionStore()
@@ -0,0 +1,28 @@
+"""
+Request coalescing for identical in-flight work
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+class SingleFlight:
+    """
+    Runs at most one coroutine per key at a time.
+
+    Callers arriving while a key is in flight await the same task and get its
+    result (or exception). The shared task is shielded, so one caller being
+    cancelled does not cancel the work for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
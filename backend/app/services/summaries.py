@@ -0,0 +1,229 @@
+"""
+AI summaries off the request path
+Quotes return at once with the template summary; the model-written summary
+is generated in the background, cached by a hash of the lane and the
+selected options, and fetched or streamed later by requestId
+"""
+import json
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, Protocol
+
+import orjson
+
+from app.config import settings
+from app.models.schemas import ShipmentDetailsRequest
+from app.services.options import Option
+from app.services.locations import location_code
+from app.services.metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Summary status reported with each quote
+TEMPLATE = "template"   # no model configured, or generation failed
+PENDING = "pending"     # model summary still being generated
+READY = "ready"         # aiSummary is the model summary
+
+SYSTEM_PROMPT = (
+    "You are a freight logistics advisor. Given a shipment and its cheapest, fastest "
+    "and best-value shipping options as JSON, write a short recommendation (at most "
+    "120 words) explaining the trade-offs and which option suits typical priorities."
+)
+
+def summary_facts(
+    details: ShipmentDetailsRequest,
+    cheapest: Option,
+    fastest: Option,
+    best_value: Option
+) -> Dict[str, Any]:
+    """What the model sees; equal facts share one cached summary"""
+    def option(o: Option) -> Dict[str, Any]:
+        return {
+            "mode": o.mode,
+            "price": o.price,
+            "transitDays": o.transitDays,
+            "reliability": o.reliability,
+            "carbonFootprint": o.carbonFootprint,
+        }
+
+    return {
+        "origin": details.origin,
+        "destination": details.destination,
+        "lane": [location_code(details.origin), location_code(details.destination)],
+        "weight": details.weight,
+        "weightUnit": details.weightUnit.value,
+        "commodity": details.commodity,
+        "hazardous": details.hazardous,
+        "temperatureControlled": details.temperatureControlled,
+        "cheapest": option(cheapest),
+        "fastest": option(fastest),
+        "bestValue": option(best_value),
+    }
+
+def summary_key(facts: Dict[str, Any]) -> str:
+    return hashlib.sha1(orjson.dumps(facts, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+class SummaryModel(Protocol):
+    async def summarize(self, facts: Dict[str, Any]) -> str: ...
+
+    async def aclose(self): ...
+
+class StubSummaryModel:
+    """Local model for tests and development: a deterministic summary after ``delay`` seconds"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    async def summarize(self, facts: Dict[str, Any]) -> str:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        cheapest, fastest, best = facts["cheapest"], facts["fastest"], facts["bestValue"]
+        return (
+            f"For {facts['weight']} {facts['weightUnit']} of {facts['commodity']} from "
+            f"{facts['origin']} to {facts['destination']}, {best['mode']} balances cost and speed "
+            f"at ${best['price']:,.2f} in {best['transitDays']} days. {cheapest['mode']} saves money "
+            f"(${cheapest['price']:,.2f}); {fastest['mode']} is quickest ({fastest['transitDays']} days)."
+        )
+
+    async def aclose(self):
+        pass
+
+class OpenAISummaryModel:
+    """Chat-completion summaries (requires the ``openai`` package)"""
+
+    def __init__(self, api_key: str, model: str):
+        try:
+            from openai import AsyncOpenAI
+        except ImportError as e:
+            raise RuntimeError("SUMMARY_MODEL=openai requires the 'openai' package") from e
+        self._client = AsyncOpenAI(api_key=api_key, max_retries=0)
+        self.model = model
+
+    async def summarize(self, facts: Dict[str, Any]) -> str:
+        response = await self._client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": json.dumps(facts)},
+            ],
+            max_tokens=300,
+            temperature=0.2,
+        )
+        return response.choices[0].message.content.strip()
+
+    async def aclose(self):
+        await self._client.close()
+
+def build_summary_model() -> Optional[SummaryModel]:
+    """Model selected by ``settings.summary_model``; None keeps template summaries"""
+    if settings.summary_model == "openai":
+        return OpenAISummaryModel(settings.openai_api_key, settings.summary_openai_model)
+    if settings.summary_model == "stub":
+        return StubSummaryModel()
+    return None
+
+class SummaryService:
+    """
+    Background summary generation with a per-process cache
+
+    ``submit`` starts generation for a quote and returns immediately;
+    concurrent quotes with the same facts share one model call, and at most
+    ``concurrency`` calls run at once. Beyond ``max_pending`` queued
+    generations new quotes keep the template summary, and ``timeout``
+    covers the wait for a model slot as well as the call itself. Finished
+    summaries are kept in an LRU keyed by ``summary_key``; requestIds map
+    to their key so clients can poll or wait for the summary after the
+    quote has been returned.
+    """
+
+    def __init__(
+        self,
+        model: Optional[SummaryModel] = None,
+        max_entries: Optional[int] = None,
+        timeout: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        max_pending: Optional[int] = None
+    ):
+        self.model = model
+        self.max_entries = max_entries or settings.summary_cache_max_entries
+        self.timeout = timeout or settings.summary_timeout
+        self.max_pending = max_pending or settings.summary_max_pending
+        self._semaphore = asyncio.Semaphore(concurrency or settings.summary_concurrency)
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._requests: "OrderedDict[str, str]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.model is not None
+
+    def submit(self, request_id: str, facts: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        """
+        Register a quote's summary: (READY, summary) on a cache hit,
+        (PENDING, None) while generating, (TEMPLATE, None) when the backlog is full
+        """
+        key = summary_key(facts)
+        # Registered first so ``get`` reports TEMPLATE, not unknown, for skipped quotes
+        self._requests[request_id] = key
+        self._requests.move_to_end(request_id)
+        while len(self._requests) > self.max_entries:
+            self._requests.popitem(last=False)
+
+        summary = self._summaries.get(key)
+        if summary is not None:
+            self._summaries.move_to_end(key)
+            return READY, summary
+        if key not in self._pending:
+            if len(self._pending) >= self.max_pending:
+                logger.debug(f"AI summary backlog full ({len(self._pending)} pending), keeping the template")
+                return TEMPLATE, None
+            self._pending[key] = asyncio.create_task(self._generate(key, facts))
+        return PENDING, None
+
+    async def _generate(self, key: str, facts: Dict[str, Any]):
+        try:
+            summary = await asyncio.wait_for(self._summarize(facts), self.timeout)
+            self._summaries[key] = summary
+            while len(self._summaries) > self.max_entries:
+                self._summaries.popitem(last=False)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"AI summary generation failed: {e!r}")
+        finally:
+            self._pending.pop(key, None)
+
+    async def _summarize(self, facts: Dict[str, Any]) -> str:
+        async with self._semaphore:
+            with span("summary.generate"):
+                return await self.model.summarize(facts)
+
+    def get(self, request_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        """(status, summary) for a quote, or None if the requestId is unknown here"""
+        key = self._requests.get(request_id)
+        if key is None:
+            return None
+        summary = self._summaries.get(key)
+        if summary is not None:
+            return READY, summary
+        if key in self._pending:
+            return PENDING, None
+        return TEMPLATE, None
+
+    async def wait(self, request_id: str, timeout: float) -> Optional[Tuple[str, Optional[str]]]:
+        """Like ``get``, first waiting up to ``timeout`` seconds for a pending summary"""
+        key = self._requests.get(request_id)
+        task = self._pending.get(key) if key is not None else None
+        if task is not None and timeout > 0:
+            # asyncio.wait never cancels the task, which other quotes may share
+            await asyncio.wait([task], timeout=timeout)
+        return self.get(request_id)
+
+    async def aclose(self):
+        for task in list(self._pending.values()):
+            task.cancel()
+        await asyncio.gather(*self._pending.values(), return_exceptions=True)
+        if self.model is not None:
+            await self.model.aclose()
@@ -2,30 +2,42 @@
 Utility functions
 """
 import re
+import math
 from typing import Tuple
 
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
 def cbm_from_dimensions(length_cm: float, width_cm: float, height_cm: float) -> float:
     """Convert dimensions (cm) to CBM"""
     return (length_cm * width_cm * height_cm) / 1000000
 
-def get_port_code(location: str) -> str:
-    """Get IATA/IATA port code from location name"""
-    # Simplified port code lookup
-    port_codes = {
-        "shanghai": "SHA",
-        "rotterdam": "RTM",
-        "singapore": "SIN",
-        "hong kong": "HKG",
-        "los angeles": "LAX",
-        "new york": "NYC",
-        "hamburg": "HAM",
-    }
-    return port_codes.get(location.lower(), location.upper()[:3])
-
 def parse_distance_from_location(origin: str, destination: str) -> Tuple[str, str]:
     """Parse origin and destination for routing"""
     return origin.strip(), destination.strip()
 
+def get_port_code(location: str) -> str:
+    """Location part of the UN/LOCODE; see ``app.services.locations.get_port_code``"""
+    # Imported here so utilities stay free of service imports at load time
+    from app.services.locations import get_port_code as resolve_port_code
+    return resolve_port_code(location)
+
+def great_circle_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle (haversine) distance between two coordinates in km"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def great_circle_km_array(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Element-wise great-circle (haversine) km between coordinate arrays in degrees"""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dlmb = np.radians(np.subtract(lon2, lon1))
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
 def estimate_transit_days(distance_km: float, mode: str) -> int:
     """Estimate transit days based on distance and mode"""
     estimates = {
@@ -0,0 +1,157 @@
+"""
+Microbenchmarks for the quote pipeline hot paths
+
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=median:20%
+"""
+import random
+
+import numpy as np
+import pytest
+
+from app.services.cache import lane_fingerprint
+from app.services.distances import get_distance_service
+from app.services.emissions import get_emissions_engine
+from app.services.options import Option
+from app.services.rate_cards import COLUMNS, MODES, RateCard, get_rate_card, write_rate_card
+from app.services.locations import get_location_resolver, get_port_code
+from app.services.routing import get_route_graph
+from app.services.scoring import DEFAULT_PRIORITIES, OptionColumns, score_options, priority_weights, top_k
+from app.services.sessions import OptionSession
+from app.services.summaries import SummaryService, StubSummaryModel, summary_facts, READY
+from app.services.selection import select_options, pareto_frontier
+from app.utils.helpers import great_circle_km
+
+from benchmarks.stubs import option_payloads
+
+def test_optimize_routes(benchmark, loop, agent, details, options):
+    result = benchmark(lambda: loop.run_until_complete(agent.optimize_routes(details, options)))
+    assert result.options
+
+def test_recommend_scoring(benchmark, options):
+    def recommend():
+        scores = score_options(OptionColumns(options), DEFAULT_PRIORITIES)
+        return top_k(scores, 5)
+
+    assert len(benchmark(recommend)) == min(5, len(options))
+
+def test_rerank_session(benchmark, details, options):
+    session = OptionSession(details, options, expires_at=float("inf"))
+    session.components
+
+    def rerank():
+        return top_k(priority_weights({"cost": 0.2, "speed": 0.7, "reliability": 0.1}) @ session.components, 5)
+
+    assert len(benchmark(rerank)) == min(5, len(options))
+
+def test_encode_quote_result(benchmark, loop, agent, details, options):
+    result = loop.run_until_complete(agent.optimize_routes(details, options))
+    assert benchmark(result.to_json)
+
+def test_select_options(benchmark, options):
+    benchmark(select_options, options)
+
+def test_pareto_frontier(benchmark, options):
+    assert benchmark(pareto_frontier, options)
+
+def test_determine_transport_legs_warm(benchmark, loop, agent, details):
+    legs = benchmark(lambda: loop.run_until_complete(agent.determine_transport_legs(details)))
+    assert legs
+
+def test_determine_transport_legs_cold(benchmark, loop, agent, details):
+    graph = get_route_graph()
+    resolver = get_location_resolver()
+
+    def clear_caches():
+        graph._family_paths.cache_clear()
+        resolver.resolve.cache_clear()
+
+    legs = benchmark.pedantic(
+        lambda: loop.run_until_complete(agent.determine_transport_legs(details)),
+        setup=clear_caches,
+        rounds=50,
+    )
+    assert legs
+
+@pytest.mark.parametrize("count", [10, 1000], ids=lambda n: f"{n}-options")
+def test_fill_leg_distances(benchmark, count):
+    service = get_distance_service()
+    payloads = option_payloads(count, random.Random(2), "Shanghai, China", "Rotterdam, Netherlands")
+
+    def fill():
+        options = [Option.from_dict(payload) for payload in payloads]
+        service.fill_routes(options)
+        return options
+
+    options = benchmark(fill)
+    assert all(leg.distance_km is not None for option in options for leg in option.route)
+
+@pytest.mark.parametrize("count", [10, 1000], ids=lambda n: f"{n}-options")
+def test_annotate_emissions(benchmark, details, count):
+    payloads = option_payloads(count, random.Random(2), "Shanghai, China", "Rotterdam, Netherlands")
+    options = [Option.from_dict(payload) for payload in payloads]
+    get_distance_service().fill_routes(options)
+    engine = get_emissions_engine()
+
+    annotated = benchmark(engine.annotate, details, options)
+    assert all(option.carbonFootprint is not None for option in annotated)
+
+@pytest.fixture(scope="module")
+def large_rate_card(tmp_path_factory):
+    """Synthetic contracted card: 300 locations, every lane and mode, 4 breaks each (1.8M rows)"""
+    codes = list(get_rate_card().code_index)
+    codes += [f"XX{i:03d}" for i in range(300 - len(codes))]
+    rng = np.random.default_rng(3)
+    keys = np.repeat(np.arange(len(codes) ** 2 * len(MODES), dtype=np.int64), 4)
+    columns = {name: rng.random(len(keys)) for name in COLUMNS}
+    columns.update(
+        lane_key=keys,
+        break_units=np.tile([0.0, 100.0, 1000.0, 10000.0], len(keys) // 4),
+        transit_days=rng.integers(1, 40, len(keys)),
+        carrier=np.zeros(len(keys)),
+    )
+    directory = tmp_path_factory.mktemp("rates") / "card"
+    write_rate_card(directory, codes, ["Contract"], columns)
+    return RateCard(directory)
+
+def test_rate_card_quote(benchmark, details):
+    card = get_rate_card()
+    assert benchmark(card.quote, details)
+
+def test_rate_card_quote_large(benchmark, details, large_rate_card):
+    assert len(benchmark(large_rate_card.quote, details)) == len(details.shipmentTypes)
+
+def test_ai_summary_cached(benchmark, loop, details, options):
+    summaries = SummaryService(StubSummaryModel())
+    cheapest, fastest, best_value = select_options(options)
+    facts = summary_facts(details, cheapest, fastest, best_value)
+
+    async def generate():
+        summaries.submit("RQ-0", facts)
+        await summaries.wait("RQ-0", 1)
+
+    loop.run_until_complete(generate())
+
+    def summarize():
+        return summaries.submit("RQ-1", summary_facts(details, cheapest, fastest, best_value))
+
+    assert benchmark(summarize)[0] == READY
+
+def test_lane_fingerprint(benchmark, details):
+    benchmark(lane_fingerprint, details)
+
+def test_resolve_location_fuzzy(benchmark):
+    resolver = get_location_resolver()
+    location = benchmark.pedantic(
+        resolver.resolve,
+        args=("Rotterdma, Netherlands",),
+        setup=resolver.resolve.cache_clear,
+        rounds=200,
+    )
+    assert location is not None
+
+def test_get_port_code(benchmark):
+    assert benchmark(get_port_code, "Shanghai, China")
+
+def test_great_circle_km(benchmark):
+    assert benchmark(great_circle_km, 31.23, 121.47, 51.92, 4.48) > 8000
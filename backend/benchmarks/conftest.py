@@ -0,0 +1,53 @@
+"""
+Shared fixtures for the microbenchmarks
+Runs against a throwaway SQLite database with persistence disabled
+"""
+import os
+import random
+import asyncio
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="freight-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+os.environ.setdefault("PERSIST_QUOTES", "False")
+
+import pytest
+
+from app.database import init_db, close_db
+from app.models.schemas import ShipmentDetailsRequest
+from app.services.options import Option
+from app.services.agent import FreightRateAgent
+from app.services.locations import get_location_resolver
+from app.services.routing import get_route_graph
+from app.services.distances import get_distance_service
+from app.services.rate_cards import get_rate_card
+
+from benchmarks.stubs import shipment_payload, option_payloads
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(init_db())
+    get_location_resolver()
+    get_route_graph()
+    get_distance_service()
+    get_rate_card()
+    yield loop
+    loop.run_until_complete(close_db())
+    loop.close()
+
+@pytest.fixture(scope="session")
+def agent(loop):
+    agent = FreightRateAgent()
+    yield agent
+    loop.run_until_complete(agent.aclose())
+
+@pytest.fixture
+def details() -> ShipmentDetailsRequest:
+    payload = shipment_payload(random.Random(1))
+    payload.update(shipmentTypes=["Ocean (FCL)", "Air Cargo", "FTL Trucking"])
+    return ShipmentDetailsRequest(**payload)
+
+@pytest.fixture(params=[10, 1000], ids=lambda n: f"{n}-options")
+def options(request):
+    return [Option.from_dict(o) for o in option_payloads(request.param, random.Random(2))]
@@ -0,0 +1,191 @@
+"""
+Async load generator for the quote and recommend endpoints
+
+Drives the in-process app through httpx's ASGI transport with stub
+providers, so results measure this service and nothing on the network.
+
+    python -m benchmarks.loadgen --concurrency 32 --requests 2000
+    python -m benchmarks.loadgen --save benchmarks/baselines/loadgen.json
+    python -m benchmarks.loadgen --compare benchmarks/baselines/loadgen.json --tolerance 0.2
+
+Run from backend/. Exits non-zero when --compare finds a p95 or throughput
+regression beyond the tolerance.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+from collections import Counter
+from typing import List, Dict, Any, Callable, Awaitable, Optional
+
+import numpy as np
+
+ENDPOINTS = ("quote", "recommend")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", choices=ENDPOINTS + ("all",), default="all")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent virtual clients")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per endpoint")
+    parser.add_argument("--provider-latency-ms", type=float, default=50.0)
+    parser.add_argument("--provider-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--provider-error-rate", type=float, default=0.0)
+    parser.add_argument("--options", type=int, default=50, help="options per recommend request")
+    parser.add_argument("--cache", action="store_true", help="keep the lane quote cache enabled")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="write results to this baseline file")
+    parser.add_argument("--compare", help="compare results against this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    return parser.parse_args(argv)
+
+def configure_environment(args: argparse.Namespace):
+    """Settings are read at import time, so this must run before the app is imported"""
+    db_dir = tempfile.mkdtemp(prefix="freight-load-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_dir}/load.db"
+    for provider in ("FREIGHTOS", "SHIPENGINE", "EASYPOST"):
+        os.environ[f"{provider}_API_KEY"] = "stub"
+        os.environ[f"{provider}_RATE_LIMIT"] = "0"
+    if not args.cache:
+        for mode in ("OCEAN", "AIR", "LAND"):
+            os.environ[f"QUOTE_CACHE_TTL_{mode}"] = "0"
+
+def summarize(latencies: List[float], statuses: Counter, elapsed: float) -> Dict[str, Any]:
+    """Latency percentiles (ms) and throughput for one endpoint run"""
+    ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if status >= 500 or status == 0),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput": round(len(latencies) / elapsed, 2),
+        "mean": round(float(ms.mean()), 3),
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p95": round(float(np.percentile(ms, 95)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+        "max": round(float(ms.max()), 3),
+    }
+
+async def run_load(
+    send: Callable[[int], Awaitable[int]],
+    total: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    """Run ``total`` requests from ``concurrency`` closed-loop clients"""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    counter = iter(range(total))
+
+    async def client():
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                status = await send(i)
+            except Exception:
+                status = 0
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+    from main import app
+    from app.services.http_client import provider_http
+    from benchmarks.stubs import StubProviderTransport, shipment_payload, option_payloads
+
+    provider_http.transport = StubProviderTransport(
+        latency_ms=args.provider_latency_ms,
+        jitter_ms=args.provider_jitter_ms,
+        error_rate=args.provider_error_rate,
+        seed=args.seed,
+    )
+    rng = random.Random(args.seed)
+    quote_payloads = [shipment_payload(rng) for _ in range(256)]
+    recommend_payloads = [
+        {
+            "shipmentDetails": shipment_payload(rng),
+            "options": option_payloads(args.options, rng),
+            "priorities": {"cost": 0.5, "speed": 0.3, "reliability": 0.2},
+        }
+        for _ in range(64)
+    ]
+
+    results: Dict[str, Any] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://localhost", timeout=60) as http:
+            async def send_quote(i: int) -> int:
+                response = await http.post("/api/multimodal/quote", json=quote_payloads[i % len(quote_payloads)])
+                return response.status_code
+
+            async def send_recommend(i: int) -> int:
+                response = await http.post("/api/agent/recommend", json=recommend_payloads[i % len(recommend_payloads)])
+                return response.status_code
+
+            senders = {"quote": send_quote, "recommend": send_recommend}
+            for endpoint in ENDPOINTS if args.endpoint == "all" else (args.endpoint,):
+                await run_load(senders[endpoint], args.warmup, args.concurrency)
+                results[endpoint] = await run_load(senders[endpoint], args.requests, args.concurrency)
+
+    return {
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "providerLatencyMs": args.provider_latency_ms,
+            "providerJitterMs": args.provider_jitter_ms,
+            "providerErrorRate": args.provider_error_rate,
+            "options": args.options,
+            "cache": args.cache,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+def report(run: Dict[str, Any]):
+    print(f"{'endpoint':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    for endpoint, r in run["results"].items():
+        print(f"{endpoint:<12}{r['throughput']:>10.1f}{r['p50']:>10.2f}{r['p95']:>10.2f}"
+              f"{r['p99']:>10.2f}{r['max']:>10.2f}{r['errors']:>8}")
+
+def compare(run: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> bool:
+    """Print deltas against a baseline; False if anything regressed beyond ``tolerance``"""
+    ok = True
+    for endpoint, r in run["results"].items():
+        base = baseline["results"].get(endpoint)
+        if base is None:
+            continue
+        for metric, higher_is_better in (("p50", False), ("p95", False), ("p99", False), ("throughput", True)):
+            change = (r[metric] - base[metric]) / base[metric] if base[metric] else 0.0
+            regressed = change < -tolerance if higher_is_better else change > tolerance
+            gated = metric in ("p95", "throughput")
+            if regressed and gated:
+                ok = False
+            flag = "REGRESSION" if regressed and gated else ("worse" if regressed else "")
+            print(f"{endpoint:<12}{metric:<11}{base[metric]:>10.2f} -> {r[metric]:>10.2f} ({change:+.1%}) {flag}")
+    return ok
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_environment(args)
+    run = asyncio.run(main(args))
+    report(run)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(run, baseline, args.tolerance):
+            sys.exit(1)
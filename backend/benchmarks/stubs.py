@@ -0,0 +1,113 @@
+"""
+Stub freight providers and synthetic payloads for benchmarks
+"""
+import json
+import random
+import asyncio
+from typing import List, Dict, Any
+
+import httpx
+
+LANES = [
+    ("Shanghai, China", "Rotterdam, Netherlands"),
+    ("Shenzhen, China", "Los Angeles, CA"),
+    ("Singapore", "Hamburg, Germany"),
+    ("Busan, South Korea", "Long Beach, CA"),
+    ("Mumbai, India", "Felixstowe, UK"),
+    ("Ningbo, China", "Antwerp, Belgium"),
+    ("Dubai, UAE", "New York, NY"),
+    ("Hong Kong", "Le Havre, France"),
+]
+
+SHIPMENT_TYPES = [
+    ["Ocean (FCL)", "Air Cargo"],
+    ["Ocean (LCL)"],
+    ["Ocean (FCL)", "Air Cargo", "FTL Trucking"],
+    ["Air Cargo"],
+]
+
+MODES = [
+    ("Ocean (FCL)", 28, 1200.0, 0.88),
+    ("Ocean (LCL)", 32, 900.0, 0.84),
+    ("Air Cargo", 4, 4200.0, 0.95),
+    ("Sea-Air", 16, 2600.0, 0.9),
+    ("Rail", 20, 2100.0, 0.86),
+    ("FTL Trucking", 6, 1800.0, 0.92),
+]
+
+def shipment_payload(rng: random.Random) -> Dict[str, Any]:
+    """A random but realistic quote request"""
+    origin, destination = rng.choice(LANES)
+    return {
+        "shipmentTypes": rng.choice(SHIPMENT_TYPES),
+        "weight": rng.choice([250, 1000, 4500, 12000]),
+        "weightUnit": "kg",
+        "volume": rng.choice([2, 10, 28, 60]),
+        "commodity": "Electronics",
+        "hazardous": False,
+        "temperatureControlled": False,
+        "origin": origin,
+        "destination": destination,
+        "incoterms": "FOB",
+    }
+
+def option_payloads(
+    count: int,
+    rng: random.Random,
+    origin: str = "Origin",
+    destination: str = "Destination"
+) -> List[Dict[str, Any]]:
+    """``count`` shipping options spread around each mode's typical price and transit time"""
+    options = []
+    for _ in range(count):
+        mode, days, price, reliability = rng.choice(MODES)
+        options.append({
+            "mode": mode,
+            "price": round(price * rng.uniform(0.7, 1.4), 2),
+            "transitDays": max(1, days + rng.randint(-3, 5)),
+            "route": [
+                {"mode": "Truck", "origin": origin, "destination": f"{origin} Port", "duration": "1 day"},
+                {"mode": mode, "origin": f"{origin} Port", "destination": f"{destination} Port", "duration": f"{days} days"},
+            ],
+            "carbonFootprint": round(rng.uniform(50, 2500), 1),
+            "reliability": round(min(0.99, reliability + rng.uniform(-0.05, 0.05)), 3),
+        })
+    return options
+
+class StubProviderTransport(httpx.AsyncBaseTransport):
+    """
+    In-process stand-in for the provider APIs
+
+    Answers every request with ``options`` random options after a latency
+    drawn uniformly from ``latency_ms`` ± ``jitter_ms``, failing with a 503
+    for ``error_rate`` of requests.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        jitter_ms: float = 20.0,
+        error_rate: float = 0.0,
+        options: int = 3,
+        seed: int = 7,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.options = options
+        self.rng = random.Random(seed)
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        delay = self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(delay, 0) / 1000)
+        if self.rng.random() < self.error_rate:
+            return httpx.Response(503, json={"error": "stub provider unavailable"}, request=request)
+        body = json.dumps({"options": option_payloads(self.options, self.rng)})
+        return httpx.Response(
+            200,
+            content=body.encode(),
+            headers={"content-type": "application/json"},
+            request=request,
+        )
@@ -1,16 +1,24 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response, Depends
+from starlette.routing import Match
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 import os
+import time
+import logging
 from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 load_dotenv()
 
 from app.routes import agent, quotes
-from app.database import init_db
+from app.resources import AppResources, lifespan, get_resources
+from app.services.metrics import HTTP_REQUEST_SECONDS, HTTP_IN_FLIGHT, span
+from app.config import settings
 
-# Initialize FastAPI app
-app = FastAPI(title="Freight Rate Optimizer API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+# Initialize FastAPI app; shared resources live for the app lifespan
+app = FastAPI(title="Freight Rate Optimizer API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -31,13 +39,45 @@ app.add_middleware(
 app.include_router(agent.router, prefix="/api", tags=["Agent"])
 app.include_router(quotes.router, prefix="/api", tags=["Quotes"])
 
-@app.on_event("startup")
-async def startup():
-    await init_db()
-
 @app.get("/health")
-async def health_check():
-    return {"status": "ok", "service": "Freight Rate Optimizer"}
+async def health_check(resources: AppResources = Depends(get_resources)):
+    return {
+        "status": "ok",
+        "service": "Freight Rate Optimizer",
+        "providers": resources.health.snapshot(),
+        "rateLimits": resources.limiter.stats(),
+        "quoteCache": resources.cache.stats(),
+    }
+
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+def endpoint_label(request: Request) -> str:
+    """Path template of the route serving the request; anything else is "other" to bound metric cardinality"""
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match != Match.NONE:
+            return route.path
+    return "other"
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    endpoint = endpoint_label(request)
+    started = time.perf_counter()
+    status = 500
+    with HTTP_IN_FLIGHT.labels(endpoint).track_inprogress(), span(endpoint, record=False) as root:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_REQUEST_SECONDS.labels(request.method, endpoint, str(status)).observe(elapsed)
+            if elapsed >= settings.slow_request_seconds:
+                root.duration = elapsed
+                breakdown = "\n".join(root.breakdown())
+                logger.warning(f"Slow request {request.method} {endpoint}\n{breakdown}")
 
 if __name__ == "__main__":
     import uvicorn
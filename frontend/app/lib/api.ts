@@ -1,4 +1,5 @@
 import axios, { AxiosInstance } from 'axios';
+import { QuoteStreamFrame } from './types';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
@@ -32,6 +33,36 @@ class ApiClient {
     }
   }
 
+  /**
+   * Stream quotes as NDJSON frames: one "option" frame per shipping option
+   * as providers answer, then a "summary" (or "error") frame.
+   */
+  async streamQuotes(data: any, onFrame: (frame: QuoteStreamFrame) => void) {
+    const response = await fetch(`${API_BASE_URL}/multimodal/quote/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Accept: 'application/x-ndjson' },
+      body: JSON.stringify(data),
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Failed to get quotes: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop() ?? '';
+      for (const line of lines) {
+        if (line.trim()) onFrame(JSON.parse(line));
+      }
+    }
+    if (buffer.trim()) onFrame(JSON.parse(buffer));
+  }
+
   async getRecommendations(data: any) {
     try {
       const response = await this.client.post('/agent/recommend', data);
@@ -23,6 +23,8 @@ export interface TransportLeg {
   destination: string;
   duration: string;
   carrier?: string;
+  distance_km?: number;
+  co2e_kg?: number;
 }
 
 export interface ShippingOption {
@@ -32,6 +34,16 @@ export interface ShippingOption {
   route: TransportLeg[];
   carbonFootprint?: number;
   reliability?: number;
+  marketPercentile?: number;
+}
+
+export interface LaneBenchmark {
+  mode: string;
+  sampleCount: number;
+  median?: number;
+  p10?: number;
+  p90?: number;
+  trend?: number;
 }
 
 export interface QuoteResponse {
@@ -39,6 +51,23 @@ export interface QuoteResponse {
   fastest: ShippingOption;
   bestValue: ShippingOption;
   options: ShippingOption[];
+  paretoFrontier?: ShippingOption[];
+  marketBenchmarks?: LaneBenchmark[];
   aiSummary: string;
   requestId: string;
+  aiSummaryStatus?: AISummaryStatus;
+}
+
+export type AISummaryStatus = 'template' | 'pending' | 'ready';
+
+export interface AISummary {
+  requestId: string;
+  status: AISummaryStatus;
+  aiSummary: string | null;
 }
+
+export type QuoteStreamFrame =
+  | { type: 'option'; data: ShippingOption }
+  | { type: 'summary'; data: Omit<QuoteResponse, 'options'> }
+  | { type: 'aiSummary'; data: AISummary }
+  | { type: 'error'; data: { status: number; detail: string } };